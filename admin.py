@@ -0,0 +1,50 @@
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from sharding import shards
+
+def _load_user(user_id):
+    """
+    (username, is_active) пользователя из токена или None
+    """
+    db = current_app.extensions['sqlalchemy']
+    users = db.metadata.tables['users']
+    # Права проверяются по основной БД: реплика могла еще не увидеть отключение
+    db.session().use_primary()
+    rows = shards.execute(
+        db,
+        sa.select(users.c.username, users.c.is_active).where(users.c.id == user_id),
+        user_id=user_id
+    )
+    return rows[0] if rows else None
+
+def admin_required(fn):
+    """
+    Как @jwt_required(), но пускает только активных пользователей из ADMIN_USERNAMES.
+    Пользователь загружается из БД: токен отключенного или удаленного
+    администратора отклоняется, даже если еще не истек.
+    """
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = _load_user(get_jwt_identity())
+        if user is None:
+            return jsonify({
+                'success': False,
+                'message': 'User not found'
+            }), 401
+        if not user.is_active:
+            return jsonify({
+                'success': False,
+                'message': 'Account is deactivated'
+            }), 401
+        if user.username not in current_app.config['ADMIN_USERNAMES']:
+            return jsonify({
+                'success': False,
+                'message': 'Admin privileges required'
+            }), 403
+        return fn(*args, **kwargs)
+    return wrapper
@@ -1,27 +1,74 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from flask_sqlalchemy import SQLAlchemy
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_bcrypt import Bcrypt
 from datetime import datetime, timedelta
 import os
 import uuid
 import logging
 from config import ProductionConfig
+from compression import CompressedText, init_compression
+from replicas import RoutingSession
+from schema import ensure_foreign_keys, sqlite_foreign_keys
+from sharding import init_sharding, shards
+import queries
+import cached_queries
+from archive import init_archive
+from backup import init_backups
+from batch import init_batch
+from bulk_users import init_bulk_users
+from export import init_export
+from cache import cache
+from jobs import jobs
+from jwt_cache import CachingJWTManager
+from pagination import InvalidCursor, decode_cursor, parse_page_size
+from events import EventHub, TooManySubscribers
+from health import init_health
+from profiling import init_profiling
+from structured_logging import configure_logging, init_request_logging
+from user_profiles import init_user_profiles
+from sync import SyncTokenExpired, install_change_log, post_changes, post_change_triggers, prune_tombstones
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Инициализация приложения
 app = Flask(__name__)
 app.config.from_object(ProductionConfig)
 
+# Настройка логирования: JSON через очередь, вывод в отдельном потоке
+configure_logging(app)
+init_request_logging(app, logger)
+
 # Инициализация расширений
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 bcrypt = Bcrypt(app)
-jwt = JWTManager(app)
+jwt = CachingJWTManager(app)
 CORS(app)
+cache.init_app(app)
+jobs.init_app(app)
+init_sharding(app, db)
+init_profiling(app)
+init_bulk_users(app, db)
+init_compression(app, db)
+init_archive(app, db)
+init_backups(app, db)
+init_export(app, db)
+init_batch(app)
+init_health(app, db)
+init_user_profiles(app, db)
+
+# Хаб событий о новых постах для SSE
+post_events = EventHub(
+    replay_size=app.config['SSE_REPLAY_BUFFER_SIZE'],
+    max_subscribers=app.config['SSE_MAX_SUBSCRIBERS']
+)
+
+# SQLite: внешние ключи и ON DELETE CASCADE включаются на каждом соединении
+event.listen(Engine, 'connect', sqlite_foreign_keys)
 
 # Модели
 def generate_uuid():
@@ -37,7 +84,7 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
-    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
+    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def set_password(self, password):
          # Хэширование пароля с помощью bcrypt
@@ -55,13 +102,34 @@ class User(db.Model):
             'is_active': self.is_active
         }
 
+class UserProfile(db.Model):
+    __tablename__ = 'user_profiles'
+    
+    # Профиль создается при регистрации (asgi.py), читается в /auth/me
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    first_name = db.Column(db.String(50))
+    last_name = db.Column(db.String(50))
+    bio = db.Column(db.Text)
+    avatar_url = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Post(db.Model):
     __tablename__ = 'posts'
+    __table_args__ = (
+        # Keyset-пагинация по (created_at, id): общая лента и посты автора
+        db.Index('ix_posts_published_created', 'is_published', 'created_at', 'id'),
+        db.Index('ix_posts_user_created', 'user_id', 'created_at', 'id'),
+        # Посты автора с фильтром is_published (опубликованные / свои черновики)
+        db.Index('ix_posts_user_published_created', 'user_id', 'is_published', 'created_at', 'id'),
+        # Архивирование снятых с публикации по updated_at (archive.py)
+        db.Index('ix_posts_updated', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    content = db.Column(CompressedText, nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_published = db.Column(db.Boolean, default=True)
@@ -78,6 +146,49 @@ class Post(db.Model):
             'is_published': self.is_published
         }
 
+class ArchivedPost(db.Model):
+    __tablename__ = 'posts_archive'
+    __table_args__ = (
+        # Для ON DELETE CASCADE при удалении пользователя
+        db.Index('ix_posts_archive_user', 'user_id'),
+    )
+    
+    # Холодные посты, переносятся из posts задачей archive_posts (archive.py)
+    id = db.Column(db.String(36), primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(CompressedText, nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    is_published = db.Column(db.Boolean)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class PostChange(db.Model):
+    __tablename__ = 'post_change_log'
+    __table_args__ = (
+        db.Index('ix_post_change_log_deleted', 'deleted_at'),
+        {'sqlite_autoincrement': True}
+    )
+    
+    # Журнал для синхронизации (sync.py), заполняется триггерами trg_posts_change_*:
+    # одна строка на пост, seq - номер последнего изменения, deleted_at - время удаления
+    seq = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.String(36), unique=True, nullable=False)
+    user_id = db.Column(db.String(36), nullable=False)
+    deleted_at = db.Column(db.DateTime)
+
+class UserDirectory(db.Model):
+    __tablename__ = 'user_directory'
+    
+    # Справочник шардов (sharding.py), хранится только в основной БД
+    id = db.Column(db.String(36), primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    shard = db.Column(db.String(20), nullable=False)
+
+for trigger in post_change_triggers:
+    event.listen(Post.__table__, 'after_create', trigger)
+
 # Маршруты
 
 # 1. POST /auth/login
@@ -101,6 +212,7 @@ def login():
                 'message': 'Username and password are required'
             }), 400
         
+        shards.use_user_shard(db, username=username)
         user = User.query.filter_by(username=username).first()
         
         if not user or not user.check_password(password):
@@ -120,7 +232,8 @@ def login():
             additional_claims={'username': user.username}
         )
         
-        logger.info(f"User {username} logged in successfully")
+        logger.info("User %s logged in successfully", username,
+                    extra={'event': 'login', 'user_id': user.id, 'sample_rate': app.config['LOG_EVENT_SAMPLE_RATE']})
         
         return jsonify({
             'success': True,
@@ -133,7 +246,7 @@ def login():
         }), 200
         
     except Exception as e:
-        logger.error(f"Login error: {str(e)}")
+        logger.error("Login error: %s", e)
         return jsonify({
             'success': False,
             'message': f'Login error: {str(e)}'
@@ -145,41 +258,18 @@ def login():
 def get_data():
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
         
-        if not current_user:
+        # Только чтение: Core-запросы без ORM-объектов, результаты кэшируются
+        if not cached_queries.user_exists(db, current_user_id):
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
         
-        # Статистика
-        total_users = User.query.count()
-        total_posts = Post.query.count()
-        user_posts = Post.query.filter_by(user_id=current_user_id).count()
-        
-        # Последние посты
-        recent_posts = Post.query.filter_by(is_published=True)\
-                               .order_by(Post.created_at.desc())\
-                               .limit(5)\
-                               .all()
-        
-        # Пользователи
-        users = User.query.filter_by(is_active=True).all()
-        
         data = {
-            'stats': {
-                'total_users': total_users,
-                'total_posts': total_posts,
-                'your_posts': user_posts
-            },
-            'recent_posts': [post.to_dict() for post in recent_posts],
-            'users': [{
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'created_at': user.created_at.isoformat()
-            } for user in users]
+            'stats': cached_queries.dashboard_stats(db, current_user_id),
+            'recent_posts': cached_queries.recent_posts(db, limit=5),
+            'users': cached_queries.active_users(db)
         }
         
         return jsonify({
@@ -189,7 +279,7 @@ def get_data():
         }), 200
         
     except Exception as e:
-        logger.error(f"Error retrieving data: {str(e)}")
+        logger.error("Error retrieving data: %s", e)
         return jsonify({
             'success': False,
             'message': f'Error retrieving data: {str(e)}'
@@ -224,6 +314,7 @@ def create_post():
                 'message': 'Title too long (max 200 characters)'
             }), 400
         
+        shards.use_user_shard(db, user_id=current_user_id)
         post = Post(
             title=title,
             content=content,
@@ -232,23 +323,202 @@ def create_post():
         
         db.session.add(post)
         db.session.commit()
+        cached_queries.invalidate_posts()
+        
+        logger.info("Post created by user %s: %s", current_user_id, title,
+                    extra={'event': 'post_created', 'user_id': current_user_id, 'post_id': post.id,
+                           'sample_rate': app.config['LOG_EVENT_SAMPLE_RATE']})
         
-        logger.info(f"Post created by user {current_user_id}: {title}")
+        post_data = post.to_dict()
+        if post.is_published:
+            post_events.publish('post_created', post_data)
         
         return jsonify({
             'success': True,
             'message': 'Post created successfully',
-            'data': post.to_dict()
+            'data': post_data
         }), 201
         
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error creating post: {str(e)}")
+        logger.error("Error creating post: %s", e)
         return jsonify({
             'success': False,
             'message': f'Error creating post: {str(e)}'
         }), 500
 
+# 4. GET /api/posts и GET /api/users/<id>/posts - постраничный список постов
+def _parse_published(value):
+    if value is None or value == 'true':
+        return True
+    if value == 'false':
+        return False
+    if value == 'all':
+        return None
+    raise ValueError("is_published must be 'true', 'false' or 'all'")
+
+def _list_posts(author_id=None):
+    try:
+        current_user_id = get_jwt_identity()
+        
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+            published = _parse_published(request.args.get('is_published'))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        if author_id is not None and not queries.user_exists(db, author_id):
+            return jsonify({
+                'success': False,
+                'message': 'User not found'
+            }), 404
+        
+        posts, next_cursor = queries.posts_page(
+            db,
+            viewer_id=current_user_id,
+            after=after,
+            limit=limit,
+            author_id=author_id,
+            published=published
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Posts retrieved successfully',
+            'data': {
+                'posts': posts,
+                'next_cursor': next_cursor
+            }
+        }), 200
+        
+    except Exception as e:
+        logger.error("Error listing posts: %s", e)
+        return jsonify({
+            'success': False,
+            'message': f'Error listing posts: {str(e)}'
+        }), 500
+
+@app.route('/api/posts', methods=['GET'])
+@jwt_required()
+def list_posts():
+    return _list_posts()
+
+@app.route('/api/users/<user_id>/posts', methods=['GET'])
+@jwt_required()
+def list_user_posts(user_id):
+    return _list_posts(author_id=user_id)
+
+# 5. GET /api/posts/changes - изменения постов с момента токена синхронизации
+@app.route('/api/posts/changes', methods=['GET'])
+@jwt_required()
+def get_post_changes():
+    try:
+        current_user_id = get_jwt_identity()
+        
+        try:
+            changes = post_changes(
+                db,
+                viewer_id=current_user_id,
+                since=request.args.get('since'),
+                limit=app.config['SYNC_PAGE_SIZE'],
+                retention_days=app.config['SYNC_TOMBSTONE_RETENTION_DAYS']
+            )
+        except InvalidCursor as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        except SyncTokenExpired as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 410
+        
+        return jsonify({
+            'success': True,
+            'message': 'Changes retrieved successfully',
+            'data': changes
+        }), 200
+        
+    except Exception as e:
+        logger.error("Error retrieving post changes: %s", e)
+        return jsonify({
+            'success': False,
+            'message': f'Error retrieving post changes: {str(e)}'
+        }), 500
+
+# 6. GET /api/posts/stream - новые посты через Server-Sent Events
+@app.route('/api/posts/stream', methods=['GET'])
+@jwt_required()
+def stream_posts():
+    try:
+        subscription, backlog = post_events.subscribe(request.headers.get('Last-Event-ID'))
+    except TooManySubscribers:
+        return jsonify({
+            'success': False,
+            'message': 'Too many stream subscribers, retry later'
+        }), 503, {'Retry-After': '5'}
+    
+    heartbeat = app.config['SSE_HEARTBEAT_SECONDS']
+    
+    def generate():
+        try:
+            # Подсказка клиенту, через сколько переподключаться
+            yield 'retry: 3000\n\n'
+            for message in backlog:
+                yield message
+            while True:
+                message = subscription.get(timeout=heartbeat)
+                if message is not None:
+                    yield message
+                elif subscription.closed:
+                    break
+                else:
+                    yield ': heartbeat\n\n'
+        finally:
+            subscription.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+# 7. GET /api/posts/<id> - пост по id, в том числе из архива
+@app.route('/api/posts/<post_id>', methods=['GET'])
+@jwt_required()
+def get_post(post_id):
+    try:
+        current_user_id = get_jwt_identity()
+        post = queries.post_by_id(db, post_id, viewer_id=current_user_id)
+        
+        if post is None:
+            return jsonify({
+                'success': False,
+                'message': 'Post not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': 'Post retrieved successfully',
+            'data': post
+        }), 200
+        
+    except Exception as e:
+        logger.error("Error retrieving post: %s", e)
+        return jsonify({
+            'success': False,
+            'message': f'Error retrieving post: {str(e)}'
+        }), 500
+
 # JWT обработчики ошибок
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
@@ -282,42 +552,40 @@ def not_found(error):
 # Инициализация базы данных
 def init_db():
     with app.app_context():
+        db.session().use_primary()
         db.create_all()
+        # Схема шардов (справочник user_directory остается в основной БД)
+        shards.create_all(db)
+        
+        # Таблицы, созданные до ON DELETE CASCADE, пересоздаются с новыми ключами
+        ensure_foreign_keys(db, ['posts', 'posts_archive', 'user_profiles'])
+        
+        # create_all не добавляет новые индексы и триггеры в уже существующие таблицы
+        for index in (*Post.__table__.indexes, *UserProfile.__table__.indexes):
+            index.create(db.engine, checkfirst=True)
+        install_change_log(db)
+        
+        prune_tombstones(db, app.config['SYNC_TOMBSTONE_RETENTION_DAYS'])
         
         # Создаем тестового пользователя если нет пользователей
-        if User.query.count() == 0:
-            admin_user = User(
-                username='admin',
-                email='admin@example.com'
-            )
-            admin_user.set_password('admin123')
-            
-            test_user = User(
-                username='testuser',
-                email='test@example.com'
-            )
-            test_user.set_password('test123')
-            
-            db.session.add(admin_user)
-            db.session.add(test_user)
-            db.session.commit()
-            
-            # Создаем тестовые посты
-            post1 = Post(
-                title='Добро пожаловать в наше приложение!',
-                content='Это первый демонстрационный пост. Рады видеть вас здесь!',
-                user_id=admin_user.id
-            )
-            
-            post2 = Post(
-                title='Второй демонстрационный пост',
-                content='Этот пост создан тестовым пользователем.',
-                user_id=test_user.id
-            )
-            
-            db.session.add(post1)
-            db.session.add(post2)
-            db.session.commit()
+        users = User.__table__
+        if not shards.execute(db, sa.select(users.c.id).limit(1)):
+            seed = [
+                ('admin', 'admin@example.com', 'admin123',
+                 'Добро пожаловать в наше приложение!',
+                 'Это первый демонстрационный пост. Рады видеть вас здесь!'),
+                ('testuser', 'test@example.com', 'test123',
+                 'Второй демонстрационный пост',
+                 'Этот пост создан тестовым пользователем.')
+            ]
+            # Каждый пользователь со своим постом - в своем шарде, отдельной транзакцией
+            for username, email, password, title, content in seed:
+                user = User(id=generate_uuid(), username=username, email=email)
+                user.set_password(password)
+                shards.place_user(db, user.id, username, email)
+                db.session.add(user)
+                db.session.add(Post(title=title, content=content, user_id=user.id))
+                db.session.commit()
             
             logger.info("=" * 50)
             logger.info("Тестовые данные созданы!")
@@ -0,0 +1,109 @@
+import logging
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+
+import cached_queries
+from jobs import jobs
+from sharding import shards
+
+logger = logging.getLogger(__name__)
+
+# Архив постов: старые (ARCHIVE_AFTER_DAYS) и давно не менявшиеся неопубликованные
+# (ARCHIVE_UNPUBLISHED_AFTER_DAYS) посты переносятся из posts в posts_archive.
+# Лента, счетчики и keyset-пагинация работают только с "горячей" таблицей posts
+# и ее индексами; пост из архива по-прежнему доступен по id (queries.post_by_id).
+
+def archive_condition(posts, now, archive_after_days, unpublished_after_days):
+    conditions = []
+    if archive_after_days:
+        # По условию на каждое значение is_published SQLite использует ix_posts_published_created
+        cutoff = now - timedelta(days=archive_after_days)
+        conditions += [
+            sa.and_(posts.c.is_published == sa.true(), posts.c.created_at < cutoff),
+            sa.and_(posts.c.is_published == sa.false(), posts.c.created_at < cutoff)
+        ]
+    if unpublished_after_days:
+        cutoff = now - timedelta(days=unpublished_after_days)
+        conditions.append(sa.and_(posts.c.is_published == sa.false(), posts.c.updated_at < cutoff))
+    return sa.or_(*conditions) if conditions else None
+
+def archive_batch(db, post_ids, now):
+    """
+    Переносит посты в архив одной транзакцией. Содержимое копируется как есть
+    (сжатое остается сжатым). Записи журнала синхронизации, которые триггер
+    пишет при DELETE, удаляются: для синхронизации пост не удален, он просто
+    ушел из ленты.
+    """
+    tables = db.metadata.tables
+    posts = tables['posts']
+    archive = tables['posts_archive']
+    change_log = tables['post_change_log']
+    columns = [column.name for column in posts.columns]
+
+    db.session.execute(
+        sa.insert(archive).from_select(
+            columns + ['archived_at'],
+            sa.select(*[posts.c[name] for name in columns], sa.literal(now, sa.DateTime))
+              .where(posts.c.id.in_(post_ids))
+        )
+    )
+    db.session.execute(sa.delete(posts).where(posts.c.id.in_(post_ids)))
+    db.session.execute(sa.delete(change_log).where(change_log.c.post_id.in_(post_ids)))
+    db.session.commit()
+
+def archive_posts(db, archive_after_days, unpublished_after_days, batch_size=500, max_batches=None):
+    """
+    Генератор: число перенесенных постов после каждой порции.
+    Порции ограничены batch_size, чтобы не держать долгую блокировку записи.
+    """
+    posts = db.metadata.tables['posts']
+    now = datetime.utcnow()
+    condition = archive_condition(posts, now, archive_after_days, unpublished_after_days)
+    if condition is None:
+        return
+
+    moved = batches = 0
+    for _ in shards.each(db):
+        while max_batches is None or batches < max_batches:
+            post_ids = db.session.execute(sa.select(posts.c.id).where(condition).limit(batch_size)).scalars().all()
+            if not post_ids:
+                break
+            archive_batch(db, post_ids, now)
+            cached_queries.invalidate_posts()
+            moved += len(post_ids)
+            batches += 1
+            yield moved
+
+def init_archive(app, db):
+    config = app.config
+
+    @jobs.task('archive_posts')
+    def archive_posts_job():
+        moved = 0
+        for moved in archive_posts(
+            db,
+            config['ARCHIVE_AFTER_DAYS'],
+            config['ARCHIVE_UNPUBLISHED_AFTER_DAYS'],
+            config['ARCHIVE_BATCH_SIZE'],
+            config['ARCHIVE_MAX_BATCHES']
+        ):
+            pass
+        if moved:
+            logger.info("Archived %s posts", moved, extra={'event': 'posts_archived', 'moved': moved})
+
+    if config['ARCHIVE_INTERVAL']:
+        jobs.schedule('archive_posts', config['ARCHIVE_INTERVAL'])
+
+    @app.cli.command('archive-posts')
+    @click.option('--older-than-days', type=int, default=config['ARCHIVE_AFTER_DAYS'], show_default=True)
+    @click.option('--unpublished-after-days', type=int, default=config['ARCHIVE_UNPUBLISHED_AFTER_DAYS'],
+                  show_default=True)
+    @click.option('--batch-size', type=click.IntRange(1, 10000), default=config['ARCHIVE_BATCH_SIZE'])
+    def archive_posts_command(older_than_days, unpublished_after_days, batch_size):
+        """Move old and stale unpublished posts to posts_archive."""
+        moved = 0
+        for moved in archive_posts(db, older_than_days, unpublished_after_days, batch_size):
+            click.echo(f'{moved} posts archived')
+        click.echo(f'Done: {moved} posts archived')
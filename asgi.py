@@ -0,0 +1,443 @@
+"""
+ASGI-режим: асинхронные обработчики /auth/* и /api/data поверх aiosqlite,
+остальные маршруты обслуживает Flask-приложение (через a2wsgi в пуле потоков).
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial, wraps
+
+import bcrypt as bcrypt_lib
+import sqlalchemy as sa
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import create_access_token, decode_token
+from jwt import ExpiredSignatureError, InvalidTokenError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app import app as flask_app
+from models import db, generate_uuid
+from jobs import jobs
+from replicas import REPLICA_BIND_PREFIX, sticky_writes
+import health
+from sharding import shards
+import queries
+import cached_queries
+
+config = flask_app.config
+
+def async_url(url):
+    """
+    sqlite:///app.db -> sqlite+aiosqlite:///app.db
+    """
+    url = sa.engine.make_url(url)
+    if url.drivername == 'sqlite':
+        url = url.set(drivername='sqlite+aiosqlite')
+    return url
+
+# Основная БД и реплики для чтения (те же URI, что и у Flask-приложения)
+def make_engine(url):
+    return create_async_engine(
+        async_url(url),
+        pool_size=config['ASYNC_DB_POOL_SIZE'],
+        max_overflow=config['ASYNC_DB_MAX_OVERFLOW']
+    )
+
+engine = make_engine(config['SQLALCHEMY_DATABASE_URI'])
+replica_engines = [
+    make_engine(url) for key, url in config['SQLALCHEMY_BINDS'].items()
+    if key.startswith(REPLICA_BIND_PREFIX)
+]
+# Шарды (sharding.py); справочник user_directory - в основной БД
+shard_engines = {key: make_engine(config['SQLALCHEMY_BINDS'][key]) for key in shards.keys}
+
+# bcrypt нагружает CPU: выполняем его в отдельном пуле, а не в event loop
+bcrypt_pool = ThreadPoolExecutor(
+    max_workers=config['ASYNC_BCRYPT_WORKERS'],
+    thread_name_prefix='bcrypt'
+)
+
+# Задачи bcrypt, отправленные в пул и еще не завершенные (меняются только в event loop)
+bcrypt_pending = 0
+
+async def run_bcrypt(func, *args):
+    global bcrypt_pending
+    loop = asyncio.get_running_loop()
+    bcrypt_pending += 1
+    try:
+        return await loop.run_in_executor(bcrypt_pool, func, *args)
+    finally:
+        bcrypt_pending -= 1
+
+def bcrypt_queue_depth():
+    return max(bcrypt_pending - config['ASYNC_BCRYPT_WORKERS'], 0)
+
+def _hash_password(password):
+    rounds = config.get('BCRYPT_LOG_ROUNDS', 12)
+    return bcrypt_lib.hashpw(password.encode('utf-8'), bcrypt_lib.gensalt(rounds)).decode('utf-8')
+
+def _check_password(password_hash, password):
+    return bcrypt_lib.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+def read_engine(identity=None):
+    """
+    Реплика для чтения, если клиент недавно не писал в основную БД
+    """
+    if not replica_engines or (identity and sticky_writes.is_sticky(f'user:{identity}')):
+        return engine
+    return random.choice(replica_engines)
+
+async def user_engine(identity=None, username=None):
+    """
+    Engine с данными пользователя: его шард по справочнику (None, если пользователя нет),
+    без шардинга - основная БД или реплика
+    """
+    if not shard_engines:
+        return read_engine(identity)
+    directory = db.metadata.tables['user_directory']
+    condition = directory.c.id == identity if identity is not None else directory.c.username == username
+    async with engine.connect() as connection:
+        key = (await connection.execute(sa.select(directory.c.shard).where(condition))).scalar()
+    return shard_engines.get(key)
+
+async def fetch_all(engines, statement):
+    """
+    Строки запроса из нескольких баз (шардов), запросы идут параллельно
+    """
+    async def fetch(target):
+        async with target.connect() as connection:
+            return (await connection.execute(statement)).all()
+
+    results = await asyncio.gather(*(fetch(target) for target in engines))
+    return [row for rows in results for row in rows]
+
+def error(message, status):
+    return JSONResponse({'success': False, 'message': message}, status_code=status)
+
+def issue_token(user_id, username):
+    with flask_app.app_context():
+        return create_access_token(identity=user_id, additional_claims={'username': username})
+
+def current_identity(request):
+    """
+    JWT identity из заголовка Authorization или JSONResponse с ошибкой 401
+    """
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None, error('Token is missing', 401)
+
+    try:
+        with flask_app.app_context():
+            claims = decode_token(header[len('Bearer '):])
+    except ExpiredSignatureError:
+        return None, error('Token has expired', 401)
+    except InvalidTokenError:
+        return None, error('Invalid token', 401)
+
+    if claims.get('type') != 'access':
+        return None, error('Invalid token', 401)
+    return claims['sub'], None
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+# POST /auth/login
+async def login(request):
+    try:
+        data = await read_json(request)
+
+        if not data:
+            return error('No JSON data provided', 400)
+
+        username = data.get('username')
+        password = data.get('password')
+
+        if not username or not password:
+            return error('Username and password are required', 400)
+
+        users = db.metadata.tables['users']
+        source = await user_engine(username=username)
+        if source is None:
+            return error('Invalid username or password', 401)
+        async with source.connect() as connection:
+            user = (await connection.execute(
+                sa.select(
+                    users.c.id, users.c.username, users.c.email, users.c.password_hash,
+                    users.c.created_at, users.c.is_active
+                ).where(users.c.username == username)
+            )).first()
+
+        if not user or not await run_bcrypt(_check_password, user.password_hash, password):
+            return error('Invalid username or password', 401)
+
+        if not user.is_active:
+            return error('Account is deactivated', 401)
+
+        return JSONResponse({
+            'success': True,
+            'message': 'Login successful',
+            'data': {
+                'access_token': issue_token(user.id, user.username),
+                'token_type': 'bearer',
+                'user': {**queries.user_row_to_dict(user), 'is_active': user.is_active}
+            }
+        })
+
+    except Exception as e:
+        return error(f'Login error: {str(e)}', 500)
+
+# POST /auth/register
+async def register(request):
+    try:
+        data = await read_json(request)
+
+        if not data:
+            return error('No JSON data provided', 400)
+
+        username = data.get('username')
+        email = data.get('email')
+        password = data.get('password')
+
+        if not all([username, email, password]):
+            return error('Username, email and password are required', 400)
+
+        if len(password) < 6:
+            return error('Password must be at least 6 characters long', 400)
+
+        if not re.match(r'[^@]+@[^@]+\.[^@]+', email):
+            return error('Invalid email format', 400)
+
+        users = db.metadata.tables['users']
+
+        # С шардингом уникальность username/email проверяет справочник в основной БД
+        directory = db.metadata.tables['user_directory']
+        registry = directory if shard_engines else users
+
+        async with engine.connect() as connection:
+            if (await connection.execute(sa.select(registry.c.id).where(registry.c.username == username))).first():
+                return error('Username already exists', 409)
+            if (await connection.execute(sa.select(registry.c.id).where(registry.c.email == email))).first():
+                return error('Email already exists', 409)
+
+        password_hash = await run_bcrypt(_hash_password, password)
+
+        user_id = generate_uuid()
+        target = engine
+        if shard_engines:
+            key = shards.shard_for(user_id)
+            async with engine.begin() as connection:
+                await connection.execute(directory.insert().values(
+                    id=user_id, username=username, email=email, shard=key
+                ))
+            target = shard_engines[key]
+
+        try:
+            async with target.begin() as connection:
+                await connection.execute(users.insert().values(
+                    id=user_id,
+                    username=username,
+                    email=email,
+                    password_hash=password_hash,
+                    is_active=True
+                ))
+                user = (await connection.execute(queries.current_user_query(db, user_id))).first()
+        except Exception:
+            if shard_engines:
+                async with engine.begin() as connection:
+                    await connection.execute(directory.delete().where(directory.c.id == user_id))
+            raise
+
+        sticky_writes.mark(f'user:{user_id}', config['READ_YOUR_WRITES_SECONDS'])
+        cached_queries.invalidate_users(user_id)
+        # Профиль создается в фоне (user_profiles.py): ответ не ждет второй записи.
+        # Постановка в очередь - запись в SQLite, поэтому вне event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, partial(jobs.enqueue, 'create_user_profile', user_id=user_id)
+        )
+        user_data = queries.current_user_row_to_dict(user)
+        user_data.pop('profile', None)
+
+        return JSONResponse({
+            'success': True,
+            'message': 'User registered successfully',
+            'data': {
+                'access_token': issue_token(user_id, username),
+                'token_type': 'bearer',
+                'user': user_data
+            }
+        }, status_code=201)
+
+    except sa.exc.IntegrityError:
+        return error('Username or email already exists', 409)
+    except Exception as e:
+        return error(f'Registration error: {str(e)}', 500)
+
+# GET /auth/me
+async def me(request):
+    identity, failure = current_identity(request)
+    if failure:
+        return failure
+
+    try:
+        source = await user_engine(identity)
+        row = None
+        if source is not None:
+            async with source.connect() as connection:
+                row = (await connection.execute(queries.current_user_query(db, identity))).first()
+
+        if row is None:
+            return error('User not found', 404)
+
+        return JSONResponse({
+            'success': True,
+            'message': 'User data retrieved successfully',
+            'data': queries.current_user_row_to_dict(row)
+        })
+
+    except Exception as e:
+        return error(f'Error retrieving user data: {str(e)}', 500)
+
+# GET /api/data
+async def get_data(request):
+    identity, failure = current_identity(request)
+    if failure:
+        return failure
+
+    try:
+        source = await user_engine(identity)
+        if source is None:
+            return error('User not found', 404)
+        async with source.connect() as connection:
+            if not (await connection.execute(queries.user_exists_query(db, identity))).first():
+                return error('User not found', 404)
+
+        # Общая статистика и лента - из всех шардов, сливаются как в queries.py
+        engines = list(shard_engines.values()) or [source]
+        stats, recent, users = await asyncio.gather(
+            fetch_all(engines, queries.dashboard_stats_query(db, identity)),
+            fetch_all(engines, queries.recent_posts_query(db, limit=5)),
+            fetch_all(engines, queries.active_users_query(db))
+        )
+
+        data = {
+            'stats': queries.merge_stats(stats),
+            'recent_posts': queries.merge_recent_posts(recent, limit=5),
+            'users': [queries.user_row_to_dict(row) for row in users]
+        }
+
+        return JSONResponse({
+            'success': True,
+            'message': 'Data retrieved successfully',
+            'data': data
+        })
+
+    except Exception as e:
+        return error(f'Error retrieving data: {str(e)}', 500)
+
+def timed(handler):
+    """
+    Длительность асинхронного обработчика - в окно задержек /ready
+    (запросы к Flask-приложению учитывает оно само)
+    """
+    @wraps(handler)
+    async def wrapper(request):
+        started = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            health.latency.add(time.perf_counter() - started)
+    return wrapper
+
+# GET /health - без ввода-вывода, не зависит от пула потоков WSGI
+async def liveness(request):
+    return JSONResponse({'success': True, 'message': 'Alive'})
+
+_ready_cache = {'expires': 0, 'databases': None}
+
+async def _ping(target):
+    started = time.perf_counter()
+    async with target.connect() as connection:
+        await connection.execute(sa.text('SELECT 1'))
+    return (time.perf_counter() - started) * 1000
+
+async def check_databases(engines):
+    """
+    SELECT 1 во всех базах параллельно с таймаутом, результат кэшируется
+    """
+    if _ready_cache['databases'] is not None and time.monotonic() < _ready_cache['expires']:
+        return _ready_cache['databases']
+
+    timeout = config['READY_DB_TIMEOUT']
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(_ping(target), timeout) for target in engines.values()),
+        return_exceptions=True
+    )
+    databases = {}
+    for name, outcome in zip(engines, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            databases[name] = {'ok': False, 'error': f'timeout after {timeout}s'}
+        elif isinstance(outcome, Exception):
+            databases[name] = {'ok': False, 'error': str(outcome)}
+        else:
+            databases[name] = {'ok': True, 'latency_ms': round(outcome, 2)}
+
+    _ready_cache.update(databases=databases, expires=time.monotonic() + config['READY_CACHE_SECONDS'])
+    return databases
+
+# GET /ready
+async def readiness(request):
+    engines = {
+        'primary': engine,
+        **{f'{REPLICA_BIND_PREFIX}{index}': replica for index, replica in enumerate(replica_engines)},
+        **shard_engines
+    }
+    report, is_ready = health.readiness_report(
+        await check_databases(engines),
+        {name: health.pool_status(target.sync_engine) for name, target in engines.items()},
+        bcrypt_queue=bcrypt_queue_depth(),
+        max_bcrypt_queue=config['READY_MAX_BCRYPT_QUEUE']
+    )
+    return JSONResponse({
+        'success': is_ready,
+        'message': 'Ready' if is_ready else 'Not ready',
+        'data': report
+    }, status_code=200 if is_ready else 503)
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    bcrypt_pool.shutdown(wait=False)
+    await engine.dispose()
+    for other in replica_engines + list(shard_engines.values()):
+        await other.dispose()
+
+application = Starlette(
+    routes=[
+        Route('/auth/login', timed(login), methods=['POST']),
+        Route('/auth/register', timed(register), methods=['POST']),
+        Route('/auth/me', timed(me), methods=['GET']),
+        Route('/api/data', timed(get_data), methods=['GET']),
+        Route('/health', liveness, methods=['GET']),
+        Route('/ready', readiness, methods=['GET']),
+        # Все остальное - синхронное Flask-приложение
+        Mount('/', app=WSGIMiddleware(flask_app, workers=config['ASYNC_WSGI_THREADS']))
+    ],
+    middleware=[
+        # Как CORS(app) во Flask: любые источники
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
@@ -1,10 +1,18 @@
 from flask import jsonify, request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from models import db, User
+from models import db, generate_uuid, User
+from jobs import jobs
+from sharding import shards
 from datetime import datetime
+import cached_queries
 import re
 
 def init_auth_routes(app):
+    """
+    Маршруты /auth/* модульного приложения (models.db). Профиль после
+    регистрации создает задача create_user_profile: вызовите для того же
+    приложения user_profiles.init_user_profiles(app, db).
+    """
     
     @app.route('/auth/login', methods=['POST'])
     def login():
@@ -26,7 +34,8 @@ def init_auth_routes(app):
                     'message': 'Username and password are required'
                 }), 400
             
-            # Ищем пользователя
+            # Ищем пользователя (в его шарде, если включен шардинг)
+            shards.use_user_shard(db, username=username)
             user = User.query.filter_by(username=username).first()
             
             if not user or not user.check_password(password):
@@ -98,30 +107,34 @@ def init_auth_routes(app):
                 }), 400
             
             # Проверяем существование пользователя
-            if User.query.filter_by(username=username).first():
+            if shards.user_exists(db, username=username):
                 return jsonify({
                     'success': False,
                     'message': 'Username already exists'
                 }), 409
             
-            if User.query.filter_by(email=email).first():
+            if shards.user_exists(db, email=email):
                 return jsonify({
                     'success': False,
                     'message': 'Email already exists'
                 }), 409
             
             # Создаем пользователя
-            user = User(username=username, email=email)
+            user = User(id=generate_uuid(), username=username, email=email)
             user.set_password(password)
             
-            db.session.add(user)
-            db.session.commit()
+            # Запись в справочнике шардов выбирает базу для пользователя
+            shards.place_user(db, user.id, username, email)
+            try:
+                db.session.add(user)
+                db.session.commit()
+            except Exception:
+                shards.remove_users(db, [user.id])
+                raise
+            cached_queries.invalidate_users(user.id)
             
-            # Создаем профиль
-            from models import UserProfile
-            profile = UserProfile(user_id=user.id)
-            db.session.add(profile)
-            db.session.commit()
+            # Профиль создается в фоне: ответ не ждет второго commit
+            jobs.enqueue('create_user_profile', user_id=user.id)
             
             # Создаем токен
             access_token = create_access_token(
@@ -151,20 +164,14 @@ def init_auth_routes(app):
     def get_current_user():
         try:
             current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            response_data = cached_queries.current_user(db, current_user_id)
             
-            if not user:
+            if not response_data:
                 return jsonify({
                     'success': False,
                     'message': 'User not found'
                 }), 404
             
-            response_data = user.to_dict()
-            
-            # Добавляем данные профиля
-            if user.profiles:
-                response_data['profile'] = user.profiles.to_dict()
-            
             return jsonify({
                 'success': True,
                 'message': 'User data retrieved successfully',
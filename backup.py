@@ -0,0 +1,245 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import click
+from flask import jsonify
+
+from admin import admin_required
+from cache import cache
+from jobs import jobs
+from sharding import shards
+
+logger = logging.getLogger(__name__)
+
+# Резервные копии SQLite без остановки приложения: online backup API копирует
+# базу порциями по BACKUP_PAGES_PER_STEP страниц, между порциями блокировка
+# снимается и запросы могут писать (пауза BACKUP_STEP_SLEEP). Запись из другого
+# соединения перезапускает копирование; после BACKUP_MAX_RESTARTS перезапусков
+# оставшаяся копия снимается за один шаг. Копия проверяется quick_check,
+# пишется во временный файл и переименовывается. Рядом - .json с метриками.
+# С шардингом в копию входят основная БД и все шарды (app-<время>.shard_N.db).
+
+SNAPSHOT_PREFIX = 'app-'
+
+class BackupRestarted(Exception):
+    pass
+
+def _sqlite_path(engine):
+    # Flask-SQLAlchemy уже разрешил относительный путь
+    url = engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        raise ValueError('Backups are supported only for file-based SQLite databases')
+    return url.database
+
+def database_files(db):
+    """
+    (суффикс имени копии, путь): основная БД и шарды, если они есть
+    """
+    return [('', _sqlite_path(db.engine))] + [
+        (f'.{key}', _sqlite_path(db.engines[key])) for key in shards.keys
+    ]
+
+def _quick_check(connection):
+    result = connection.execute('PRAGMA quick_check').fetchone()[0]
+    if result != 'ok':
+        raise sqlite3.DatabaseError(f'Integrity check failed: {result}')
+
+def copy_database(source_path, target_path, pages_per_step=256, step_sleep=0.05, max_restarts=5):
+    """
+    Копирует БД через backup API. Возвращает {'pages', 'restarts', 'mode'}
+    """
+    partial_path = target_path + '.partial'
+    state = {'remaining': None, 'total': 0, 'restarts': 0, 'mode': 'incremental'}
+
+    def progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise BackupRestarted()
+        state['remaining'] = remaining
+        state['total'] = total
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(partial_path)
+    try:
+        try:
+            source.backup(target, pages=pages_per_step, progress=progress)
+        except BackupRestarted:
+            logger.warning("Backup restarted %s times, copying the rest in one step", state['restarts'] - 1)
+            state['mode'] = 'single_step'
+            source.backup(target, pages=-1)
+        _quick_check(target)
+    except Exception:
+        target.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    os.replace(partial_path, target_path)
+    return {'pages': state['total'], 'restarts': state['restarts'], 'mode': state['mode']}
+
+def _rotate(directory, keep):
+    for meta in list_snapshots(directory)[keep:]:
+        for name in meta['files'] + [meta['id'] + '.json']:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+def list_snapshots(directory):
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        if name.startswith(SNAPSHOT_PREFIX) and name.endswith('.json'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+    return sorted(snapshots, key=lambda meta: meta['created_at'], reverse=True)
+
+def create_snapshot(db, config):
+    directory = os.path.abspath(config['BACKUP_DIR'])
+    os.makedirs(directory, exist_ok=True)
+
+    created_at = datetime.utcnow()
+    snapshot_id = SNAPSHOT_PREFIX + created_at.strftime('%Y%m%dT%H%M%S%f')
+
+    started = time.perf_counter()
+    files = []
+    pages = restarts = size_bytes = 0
+    mode = 'incremental'
+    for suffix, source_path in database_files(db):
+        name = snapshot_id + suffix + '.db'
+        stats = copy_database(
+            source_path,
+            os.path.join(directory, name),
+            pages_per_step=config['BACKUP_PAGES_PER_STEP'],
+            step_sleep=config['BACKUP_STEP_SLEEP'],
+            max_restarts=config['BACKUP_MAX_RESTARTS']
+        )
+        files.append(name)
+        pages += stats['pages']
+        restarts += stats['restarts']
+        size_bytes += os.path.getsize(os.path.join(directory, name))
+        if stats['mode'] != 'incremental':
+            mode = stats['mode']
+
+    meta = {
+        'id': snapshot_id,
+        'file': files[0],
+        'files': files,
+        'created_at': created_at.isoformat(),
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        'size_bytes': size_bytes,
+        'pages': pages,
+        'restarts': restarts,
+        'mode': mode
+    }
+    with open(os.path.join(directory, snapshot_id + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    _rotate(directory, config['BACKUP_KEEP'])
+    logger.info("Backup %s created in %.0f ms, %s bytes", snapshot_id, meta['duration_ms'], meta['size_bytes'],
+                extra={'event': 'backup', **meta})
+    return meta
+
+def _restore_file(snapshot_path, target_path):
+    source = sqlite3.connect(f'file:{snapshot_path}?mode=ro', uri=True)
+    try:
+        _quick_check(source)
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+def restore_snapshot(db, directory, snapshot_id):
+    """
+    Восстанавливает основную БД (и шарды) из копии. Каждый файл восстанавливается
+    одним шагом backup API, поэтому другие соединения видят либо старое,
+    либо новое содержимое целиком.
+    """
+    meta = next((meta for meta in list_snapshots(directory) if meta['id'] == snapshot_id), None)
+    if meta is None:
+        raise FileNotFoundError(f'Snapshot {snapshot_id} not found')
+    files = dict(database_files(db))
+    names = {name[len(snapshot_id):-len('.db')]: name for name in meta['files']}
+    if set(names) != set(files):
+        raise ValueError('Snapshot does not match the configured databases (shards changed?)')
+
+    for engine in db.engines.values():
+        engine.dispose()
+    for suffix, target_path in files.items():
+        _restore_file(os.path.join(directory, names[suffix]), target_path)
+    # Закэшированные ответы относятся к старому содержимому
+    cache.clear()
+    logger.info("Database restored from %s", snapshot_id, extra={'event': 'backup_restored'})
+
+def init_backups(app, db):
+    config = app.config
+
+    @jobs.task('backup_database')
+    def backup_database_job():
+        create_snapshot(db, config)
+
+    if config['BACKUP_INTERVAL']:
+        jobs.schedule('backup_database', config['BACKUP_INTERVAL'])
+
+    @app.route('/admin/backups', methods=['GET'])
+    @admin_required
+    def list_backups():
+        return jsonify({
+            'success': True,
+            'message': 'Backups retrieved successfully',
+            'data': list_snapshots(os.path.abspath(config['BACKUP_DIR']))
+        }), 200
+
+    @app.route('/admin/backups', methods=['POST'])
+    @admin_required
+    def start_backup():
+        job_id = jobs.enqueue('backup_database', max_attempts=1)
+        return jsonify({
+            'success': True,
+            'message': 'Backup started',
+            'data': {'job_id': job_id}
+        }), 202
+
+    @app.cli.group('backup')
+    def backup_group():
+        """Online SQLite backups."""
+
+    @backup_group.command('create')
+    def backup_create_command():
+        """Create a snapshot in BACKUP_DIR."""
+        meta = create_snapshot(db, config)
+        click.echo(f"{meta['file']}: {meta['size_bytes']} bytes in {meta['duration_ms']:.0f} ms "
+                   f"({meta['mode']}, {meta['restarts']} restarts)")
+
+    @backup_group.command('list')
+    def backup_list_command():
+        """List snapshots, newest first."""
+        for meta in list_snapshots(os.path.abspath(config['BACKUP_DIR'])):
+            click.echo(f"{meta['file']}  {meta['created_at']}  {meta['size_bytes']} bytes  {meta['duration_ms']:.0f} ms")
+
+    @backup_group.command('restore')
+    @click.argument('snapshot')
+    @click.option('--yes', is_flag=True, help='Do not ask for confirmation')
+    def backup_restore_command(snapshot, yes):
+        """Restore the databases from SNAPSHOT (id or .db file name in BACKUP_DIR)."""
+        snapshot_id = os.path.basename(snapshot).split('.')[0]
+        if not yes:
+            click.confirm(f'Replace the current database with {snapshot_id}?', abort=True)
+        try:
+            restore_snapshot(db, os.path.abspath(config['BACKUP_DIR']), snapshot_id)
+        except (FileNotFoundError, ValueError) as e:
+            raise click.BadParameter(str(e), param_hint='SNAPSHOT')
+        click.echo(f'Restored from {snapshot_id}')
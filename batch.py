@@ -0,0 +1,153 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, request
+from flask_jwt_extended import jwt_required
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# POST /api/batch: несколько запросов к API за один HTTP-запрос. Подзапросы
+# выполняются в процессе существующими обработчиками маршрутов с токеном
+# самого batch-запроса (проверка JWT берется из кэша, см. jwt_cache.py).
+# Последовательные подзапросы делят контекст приложения, а значит одну сессию
+# БД: после записи чтения идут в основную БД. Подряд идущие GET при
+# "parallel": true выполняются в пуле потоков, каждый со своей сессией
+# (Session не потокобезопасна); запись остается границей порядка.
+
+READ_METHODS = ('GET', 'HEAD')
+METHODS = READ_METHODS + ('POST', 'PUT', 'PATCH', 'DELETE')
+
+class InvalidBatch(ValueError):
+    pass
+
+def parse_batch(data, max_requests, excluded_endpoints, url_adapter):
+    """
+    Тело запроса -> список подзапросов {'method', 'path', 'body'}
+    """
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        raise InvalidBatch('requests must be a non-empty list')
+    if len(items) > max_requests:
+        raise InvalidBatch(f'Too many requests in batch (max {max_requests})')
+
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise InvalidBatch(f'requests[{index}] must be an object')
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in METHODS:
+            raise InvalidBatch(f"requests[{index}].method must be one of: {', '.join(METHODS)}")
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise InvalidBatch(f"requests[{index}].path must start with '/'")
+        # Потоковые ответы (SSE, выгрузки) и вложенные batch в пакете не выполняются
+        try:
+            endpoint, _ = url_adapter.match(path.split('?', 1)[0], method=method)
+        except HTTPException:
+            endpoint = None
+        if endpoint in excluded_endpoints:
+            raise InvalidBatch(f'requests[{index}]: {path} is not allowed in batch')
+        parsed.append({'method': method, 'path': path, 'body': item.get('body')})
+    return parsed
+
+def init_batch(app):
+    config = app.config
+    pool = ThreadPoolExecutor(max_workers=config['BATCH_MAX_WORKERS'], thread_name_prefix='batch')
+
+    def run_one(item, headers, remote_addr):
+        """
+        Подзапрос через обработчик маршрута без before/after_request:
+        логирование и профилирование относятся к самому batch-запросу
+        """
+        with app.test_request_context(
+            item['path'],
+            method=item['method'],
+            json=item['body'],
+            headers=headers,
+            environ_base={'REMOTE_ADDR': remote_addr}
+        ):
+            try:
+                try:
+                    rv = app.dispatch_request()
+                except HTTPException as e:
+                    rv = app.handle_http_exception(e)
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+
+                if isinstance(rv, HTTPException):
+                    # Ошибка без своего обработчика (405, 400 ...) возвращается как есть;
+                    # make_response приняла бы ее за WSGI-приложение с потоковым ответом
+                    status = rv.get_response().status_code
+                    return {'status': status, 'body': {'success': False, 'message': rv.description}}
+                response = app.make_response(rv)
+            except Exception as e:
+                logger.error("Batch sub-request %s %s failed: %s", item['method'], item['path'], e)
+                return {'status': 500, 'body': {'success': False, 'message': f'Error processing request: {str(e)}'}}
+
+            # Потоковый результат самого обработчика (генератор)
+            if response.is_streamed:
+                response.close()
+                return {'status': 400, 'body': {'success': False, 'message': 'Streaming responses are not supported in batch'}}
+            body = response.get_json(silent=True)
+            return {'status': response.status_code, 'body': body if body is not None else response.get_data(as_text=True)}
+
+    @app.route('/api/batch', methods=['POST'])
+    @jwt_required()
+    def batch():
+        """
+        {"requests": [{"method": "GET", "path": "/api/data"}, {"method": "POST", "path": "/api/posts", "body": {...}}],
+         "parallel": true}
+        Ответ - результаты в порядке запросов: [{"status": 200, "body": {...}}, ...]
+        """
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({
+                'success': False,
+                'message': 'No JSON data provided'
+            }), 400
+
+        try:
+            items = parse_batch(
+                data,
+                config['BATCH_MAX_REQUESTS'],
+                config['BATCH_EXCLUDED_ENDPOINTS'],
+                app.url_map.bind('')
+            )
+        except InvalidBatch as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        parallel = data.get('parallel') is True
+        headers = {'Authorization': request.headers['Authorization']}
+        remote_addr = request.remote_addr
+
+        results = []
+        index = 0
+        while index < len(items):
+            item = items[index]
+            if not parallel or item['method'] not in READ_METHODS:
+                results.append(run_one(item, headers, remote_addr))
+                index += 1
+                continue
+            # Группа подряд идущих чтений
+            end = index
+            while end < len(items) and items[end]['method'] in READ_METHODS:
+                end += 1
+            group = items[index:end]
+            if len(group) == 1:
+                results.append(run_one(item, headers, remote_addr))
+            else:
+                results.extend(pool.map(lambda sub: run_one(sub, headers, remote_addr), group))
+            index = end
+
+        logger.info("Batch of %s requests", len(items),
+                    extra={'event': 'batch', 'requests': len(items), 'parallel': parallel})
+
+        return jsonify({
+            'success': True,
+            'message': 'Batch executed',
+            'data': results
+        }), 200
@@ -0,0 +1,133 @@
+"""
+Нагрузочное сравнение синхронного gunicorn и ASGI-режима (uvicorn + asgi.py)
+при большом числе одновременных соединений к /api/data
+
+    python benchmarks/concurrency.py --connections 1000 --requests 5 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess # nosec
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'gunicorn-sync': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+        '--backlog', '2048', 'app:app'
+    ],
+    'uvicorn-asgi': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+        '--port', str(port), '--workers', str(workers), '--backlog', '2048', '--log-level', 'warning'
+    ]
+}
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/nope', timeout=1)  # nosec
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+def login(port):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}/auth/login',
+        data=json.dumps({'username': 'admin', 'password': 'admin123'}).encode(),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request) as response:  # nosec
+        return json.load(response)['data']['access_token']
+
+async def fetch(port, token):
+    # Новое соединение на каждый запрос: sync-воркеры gunicorn не держат keep-alive
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write((
+        'GET /api/data HTTP/1.1\r\n'
+        f'Host: 127.0.0.1:{port}\r\n'
+        f'Authorization: Bearer {token}\r\n'
+        'Connection: close\r\n\r\n'
+    ).encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response.startswith(b'HTTP/1.1 200')
+
+async def client(port, token, requests, latencies, errors):
+    for _ in range(requests):
+        started = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(fetch(port, token), timeout=60)
+        except (OSError, asyncio.TimeoutError):
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(1)
+
+async def load(port, token, connections, requests):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client(port, token, requests, latencies, errors) for _ in range(connections)
+    ])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'ok': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+    }
+
+def run(name, args, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    server = subprocess.Popen(  # nosec
+        SERVERS[name](args.port, args.workers), cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(args.port)
+        token = login(args.port)
+        return asyncio.run(load(args.port, token, args.connections, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=5, help='запросов на соединение')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        subprocess.run(  # nosec
+            [sys.executable, '-c', 'import app; app.init_db()'],
+            cwd=ROOT, env=dict(os.environ, DATABASE_URL=database_url), check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        print(f'connections={args.connections} requests={args.requests} workers={args.workers}')
+        print(f'{"server":<16}{"ok":>8}{"errors":>8}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}')
+        for name in args.servers:
+            result = run(name, args, database_url)
+            print(f'{name:<16}{result["ok"]:>8}{result["errors"]:>8}{result["rps"]:>10.1f}'
+                  f'{result["p50_ms"]:>10.1f}{result["p99_ms"]:>10.1f}')
+
+if __name__ == '__main__':
+    main()
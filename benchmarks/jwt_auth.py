@@ -0,0 +1,71 @@
+"""
+Накладные расходы @jwt_required на запрос: обычный JWTManager
+против CachingJWTManager (кэш проверенных токенов)
+
+    python benchmarks/jwt_auth.py --clients 100 --iterations 20000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required
+
+from config import TestingConfig
+from jwt_cache import CachingJWTManager
+
+def create_bench_app(manager_class):
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    manager = manager_class(app)
+
+    @app.route('/protected')
+    @jwt_required()
+    def protected():
+        return get_jwt_identity()
+
+    return app, manager
+
+def measure(app, tokens, iterations):
+    view = app.view_functions['protected']
+    latencies = []
+    for index in range(iterations):
+        headers = {'Authorization': f'Bearer {tokens[index % len(tokens)]}'}
+        # Контекст запроса создается вне замера: измеряется только проверка токена
+        with app.test_request_context('/protected', headers=headers):
+            started = time.perf_counter()
+            view()
+            latencies.append(time.perf_counter() - started)
+    return {
+        'median_us': statistics.median(latencies) * 1e6,
+        'p95_us': sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1e6,
+        'mean_us': statistics.fmean(latencies) * 1e6
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=100, help='distinct tokens in rotation')
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f'clients={args.clients} iterations={args.iterations}')
+    print(f'{"manager":<20}{"median us":>12}{"p95 us":>12}{"mean us":>12}')
+    for name, manager_class in [('JWTManager', JWTManager), ('CachingJWTManager', CachingJWTManager)]:
+        app, manager = create_bench_app(manager_class)
+        with app.app_context():
+            tokens = [
+                create_access_token(identity=f'user-{index}', additional_claims={'username': f'user{index}'})
+                for index in range(args.clients)
+            ]
+        result = measure(app, tokens, args.iterations)
+        print(f'{name:<20}{result["median_us"]:>12.1f}{result["p95_us"]:>12.1f}{result["mean_us"]:>12.1f}')
+        if isinstance(manager, CachingJWTManager):
+            print(f'cache: {manager.token_cache.stats()}')
+
+if __name__ == '__main__':
+    main()
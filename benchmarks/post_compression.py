@@ -0,0 +1,124 @@
+"""
+Сжатие posts.content: размер файла БД, скорость записи и чтения
+без сжатия, с zlib и с zstd (если установлен zstandard)
+
+    python benchmarks/post_compression.py --posts 1000000 --reads 5000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+import sqlalchemy as sa
+
+import compression
+from config import TestingConfig
+from models import db, User, Post
+
+WORDS = (
+    'the of and to in is that for it as was with be by on not he this are or his from at which '
+    'but have an they you were her she there been one all we their has would when if so no what '
+    'database query index page cache latency request user post content server client token'
+).split()
+
+def create_bench_app(path):
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    return app
+
+def make_content(rng):
+    # Большинство постов короткие, длинных немного (логнормальное распределение)
+    size = min(int(rng.lognormvariate(6.5, 1.0)), 50000)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+def seed(posts_count, batch_size=5000):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    user_id = str(uuid.uuid4())
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id,
+        'username': 'bench',
+        'email': 'bench@example.com',
+        'password_hash': '$2b$12$' + 'x' * 53,
+        'created_at': now,
+        'is_active': True
+    }])
+
+    post_ids = []
+    started = time.perf_counter()
+    for offset in range(0, posts_count, batch_size):
+        batch = []
+        for index in range(offset, min(offset + batch_size, posts_count)):
+            post_id = str(uuid.uuid4())
+            post_ids.append(post_id)
+            batch.append({
+                'id': post_id,
+                'title': f'Post {index}',
+                'content': make_content(rng),
+                'user_id': user_id,
+                'created_at': now - timedelta(seconds=index),
+                'updated_at': now - timedelta(seconds=index),
+                'is_published': True
+            })
+        db.session.execute(Post.__table__.insert(), batch)
+        db.session.commit()
+    return post_ids, time.perf_counter() - started
+
+def measure_reads(post_ids, reads):
+    posts = Post.__table__
+    rng = random.Random(7)
+    latencies = []
+    for _ in range(reads):
+        post_id = rng.choice(post_ids)
+        started = time.perf_counter()
+        db.session.execute(sa.select(posts.c.content).where(posts.c.id == post_id)).scalar_one()
+        latencies.append(time.perf_counter() - started)
+    db.session.remove()
+    return statistics.median(latencies) * 1000, sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--threshold', type=int, default=1024)
+    args = parser.parse_args()
+
+    modes = [('raw', 'zlib', 10 ** 12), ('zlib', 'zlib', args.threshold)]
+    if compression.zstandard is not None:
+        modes.append(('zstd', 'zstd', args.threshold))
+
+    print(f'posts={args.posts} reads={args.reads} threshold={args.threshold}')
+    print(f'{"mode":<8}{"db MB":>10}{"write s":>10}{"read median ms":>16}{"read p95 ms":>14}')
+    for name, algorithm, threshold in modes:
+        compression.configure(algorithm=algorithm, threshold=threshold, level=6 if algorithm == 'zlib' else 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            app = create_bench_app(path)
+            with app.app_context():
+                db.create_all()
+                post_ids, write_seconds = seed(args.posts)
+                db.session.execute(sa.text('VACUUM'))
+                size_mb = os.path.getsize(path) / 1024 / 1024
+                median_ms, p95_ms = measure_reads(post_ids, args.reads)
+                db.engine.dispose()
+        print(f'{name:<8}{size_mb:>10.1f}{write_seconds:>10.2f}{median_ms:>16.3f}{p95_ms:>14.3f}')
+
+if __name__ == '__main__':
+    main()
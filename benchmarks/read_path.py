@@ -0,0 +1,155 @@
+"""
+Сравнение ORM и Core read path для /api/data и /auth/me:
+задержка и выделение памяти на запрос (tracemalloc)
+
+    python benchmarks/read_path.py --users 1000 --posts 20000 --iterations 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from config import TestingConfig
+from models import db, User, Post, UserProfile
+import queries
+
+def create_bench_app(path):
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    return app
+
+def seed(users_count, posts_count):
+    # Фиктивный хэш: bcrypt здесь не измеряется
+    password_hash = '$2b$12$' + 'x' * 53
+    now = datetime.utcnow()
+    user_ids = [str(uuid.uuid4()) for _ in range(users_count)]
+
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id,
+        'username': f'user{index}',
+        'email': f'user{index}@example.com',
+        'password_hash': password_hash,
+        'created_at': now,
+        'is_active': True
+    } for index, user_id in enumerate(user_ids)])
+
+    db.session.execute(UserProfile.__table__.insert(), [{
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'first_name': 'First',
+        'updated_at': now
+    } for user_id in user_ids])
+
+    db.session.execute(Post.__table__.insert(), [{
+        'id': str(uuid.uuid4()),
+        'title': f'Post {index}',
+        'content': 'Lorem ipsum ' * 20,
+        'user_id': user_ids[index % users_count],
+        'created_at': now - timedelta(seconds=index),
+        'updated_at': now - timedelta(seconds=index),
+        'is_published': True
+    } for index in range(posts_count)])
+
+    db.session.commit()
+    return user_ids
+
+# Прежняя реализация через ORM (для сравнения)
+
+def orm_data(user_id):
+    User.query.get(user_id)
+    recent = Post.query.filter_by(is_published=True)\
+                       .order_by(Post.created_at.desc())\
+                       .limit(5)\
+                       .all()
+    users = User.query.filter_by(is_active=True).all()
+    return {
+        'stats': {
+            'total_users': User.query.count(),
+            'total_posts': Post.query.count(),
+            'your_posts': Post.query.filter_by(user_id=user_id).count()
+        },
+        'recent_posts': [post.to_dict() for post in recent],
+        'users': [{
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'created_at': user.created_at.isoformat()
+        } for user in users]
+    }
+
+def orm_me(user_id):
+    user = User.query.get(user_id)
+    data = user.to_dict()
+    if user.profiles:
+        data['profile'] = user.profiles.to_dict()
+    return data
+
+def core_data(user_id):
+    queries.user_exists(db, user_id)
+    return {
+        'stats': queries.dashboard_stats(db, user_id),
+        'recent_posts': queries.recent_posts(db, limit=5),
+        'users': queries.active_users(db)
+    }
+
+def core_me(user_id):
+    return queries.current_user(db, user_id)
+
+def measure(func, user_ids, iterations):
+    latencies = []
+    peaks = []
+    for index in range(iterations):
+        user_id = user_ids[index % len(user_ids)]
+        tracemalloc.start()
+        started = time.perf_counter()
+        func(user_id)
+        latencies.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        # Как в конце запроса: новая сессия на следующую итерацию
+        db.session.remove()
+    return {
+        'median_ms': statistics.median(latencies) * 1000,
+        'p95_ms': sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+        'median_peak_kb': statistics.median(peaks) / 1024
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            user_ids = seed(args.users, args.posts)
+
+            # Проверяем, что ответы совпадают
+            assert orm_data(user_ids[0]) == core_data(user_ids[0])
+            assert orm_me(user_ids[0]) == core_me(user_ids[0])
+            db.session.remove()
+
+            print(f'users={args.users} posts={args.posts} iterations={args.iterations}')
+            print(f'{"path":<16}{"median ms":>12}{"p95 ms":>12}{"peak KB":>12}')
+            for name, func in [('orm /api/data', orm_data), ('core /api/data', core_data),
+                               ('orm /auth/me', orm_me), ('core /auth/me', core_me)]:
+                result = measure(func, user_ids, args.iterations)
+                print(f'{name:<16}{result["median_ms"]:>12.2f}'
+                      f'{result["p95_ms"]:>12.2f}{result["median_peak_kb"]:>12.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import json
+import logging
+from datetime import datetime
+
+import click
+import sqlalchemy as sa
+from flask import Response, jsonify, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+
+import cached_queries
+from admin import admin_required
+from sharding import shards
+
+logger = logging.getLogger(__name__)
+
+# Массовые операции над пользователями: UPDATE/DELETE по множеству id
+# порциями по chunk_size, каждая порция - отдельная транзакция.
+# Посты и профили удаляет сама БД (ON DELETE CASCADE) без загрузки в память,
+# журнал синхронизации пишут триггеры trg_posts_change_*.
+# С шардингом операция проходит по шардам по очереди.
+
+ACTIONS = ('deactivate', 'reactivate', 'delete')
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+
+class InvalidBulkRequest(ValueError):
+    pass
+
+def _parse_datetime(value, field):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidBulkRequest(f'{field} must be an ISO 8601 datetime')
+
+def parse_selection(ids=None, filters=None):
+    """
+    Список id и/или фильтр -> (ids, filters) с проверенными значениями.
+    Фильтр: username_prefix, is_active, created_before, created_after.
+    Пустой выбор запрещен, чтобы случайно не затронуть всех пользователей.
+    """
+    filters = dict(filters or {})
+    unknown = set(filters) - {'username_prefix', 'is_active', 'created_before', 'created_after'}
+    if unknown:
+        raise InvalidBulkRequest(f"Unknown filter fields: {', '.join(sorted(unknown))}")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(user_id, str) for user_id in ids):
+            raise InvalidBulkRequest('ids must be a list of strings')
+        ids = list(dict.fromkeys(ids))
+
+    if 'is_active' in filters and not isinstance(filters['is_active'], bool):
+        raise InvalidBulkRequest('is_active must be a boolean')
+    if 'username_prefix' in filters and not (isinstance(filters['username_prefix'], str) and filters['username_prefix']):
+        raise InvalidBulkRequest('username_prefix must be a non-empty string')
+    for field in ('created_before', 'created_after'):
+        if field in filters:
+            filters[field] = _parse_datetime(filters[field], field)
+
+    if not ids and not filters:
+        raise InvalidBulkRequest('Either ids or filter is required')
+    return ids, filters
+
+def _conditions(users, ids, filters, exclude_ids):
+    conditions = []
+    if ids:
+        conditions.append(users.c.id.in_(ids))
+    if 'username_prefix' in filters:
+        conditions.append(users.c.username.startswith(filters['username_prefix'], autoescape=True))
+    if 'is_active' in filters:
+        conditions.append(users.c.is_active.is_(filters['is_active']))
+    if 'created_before' in filters:
+        conditions.append(users.c.created_at < filters['created_before'])
+    if 'created_after' in filters:
+        conditions.append(users.c.created_at >= filters['created_after'])
+    if exclude_ids:
+        conditions.append(users.c.id.not_in(list(exclude_ids)))
+    return conditions
+
+def _chunk_statement(users, action, chunk):
+    if action == 'delete':
+        return sa.delete(users).where(users.c.id.in_(chunk))
+    # Отбираем только тех, кому действительно нужно изменение
+    active = action == 'reactivate'
+    return sa.update(users).where(users.c.id.in_(chunk), users.c.is_active.is_not(active)).values(is_active=active)
+
+def run_bulk_action(db, action, ids=None, filters=None, exclude_ids=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Генератор прогресса: {'processed', 'affected', 'total'} после каждой порции.
+    Порции выбираются keyset-обходом по users.id, поэтому каждая следующая
+    выборка идет по индексу первичного ключа, а не через OFFSET.
+    Прерванную операцию можно просто повторить.
+    """
+    if action not in ACTIONS:
+        raise InvalidBulkRequest(f"action must be one of: {', '.join(ACTIONS)}")
+    ids, filters = parse_selection(ids, filters)
+
+    users = db.metadata.tables['users']
+    conditions = _conditions(users, ids, filters, exclude_ids)
+
+    count = sa.select(sa.func.count()).select_from(users).where(*conditions)
+    # Выборка и запись должны видеть одну и ту же БД (основную или шард)
+    total = sum(db.session.execute(count).scalar() for _ in shards.each(db))
+
+    processed = affected = 0
+    for _ in shards.each(db):
+        last_id = None
+        while True:
+            page = sa.select(users.c.id).where(*conditions).order_by(users.c.id).limit(chunk_size)
+            if last_id is not None:
+                page = page.where(users.c.id > last_id)
+            chunk = db.session.execute(page).scalars().all()
+            if not chunk:
+                break
+
+            result = db.session.execute(_chunk_statement(users, action, chunk))
+            db.session.commit()
+
+            cached_queries.invalidate_users(*chunk)
+            if action == 'delete':
+                shards.remove_users(db, chunk)
+                cached_queries.invalidate_posts()
+
+            last_id = chunk[-1]
+            processed += len(chunk)
+            affected += result.rowcount
+            yield {'processed': processed, 'affected': affected, 'total': total}
+
+    logger.info("Bulk %s: %s of %s users affected", action, affected, total,
+                extra={'event': 'bulk_users', 'action': action, 'affected': affected, 'total': total})
+
+def _parse_chunk_size(value):
+    if value is None:
+        return DEFAULT_CHUNK_SIZE
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_CHUNK_SIZE:
+        raise InvalidBulkRequest(f'chunk_size must be an integer between 1 and {MAX_CHUNK_SIZE}')
+    return value
+
+def init_bulk_users(app, db):
+    @app.route('/admin/users/bulk', methods=['POST'])
+    @admin_required
+    def bulk_users():
+        """
+        {"action": "deactivate", "ids": [...], "filter": {...}, "chunk_size": 500}
+        Ответ - NDJSON: строка прогресса на каждую порцию, в конце итог.
+        """
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({
+                'success': False,
+                'message': 'No JSON data provided'
+            }), 400
+
+        action = data.get('action')
+        try:
+            if action not in ACTIONS:
+                raise InvalidBulkRequest(f"action must be one of: {', '.join(ACTIONS)}")
+            chunk_size = _parse_chunk_size(data.get('chunk_size'))
+            ids, filters = parse_selection(data.get('ids'), data.get('filter'))
+        except InvalidBulkRequest as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        # Администратор не может удалить или отключить сам себя
+        exclude_ids = () if action == 'reactivate' else (get_jwt_identity(),)
+
+        def generate():
+            progress = {'processed': 0, 'affected': 0, 'total': 0}
+            try:
+                for progress in run_bulk_action(db, action, ids, filters, exclude_ids, chunk_size):
+                    yield json.dumps({'event': 'progress', **progress}) + '\n'
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Bulk %s failed: %s", action, e)
+                yield json.dumps({'event': 'error', 'message': str(e), **progress}) + '\n'
+                return
+            yield json.dumps({'event': 'done', 'action': action, **progress}) + '\n'
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'X-Accel-Buffering': 'no'}
+        )
+
+    @app.cli.command('bulk-users')
+    @click.argument('action', type=click.Choice(ACTIONS))
+    @click.option('--id', 'ids', multiple=True, help='User id (can be repeated)')
+    @click.option('--username-prefix', help='Users whose username starts with this prefix')
+    @click.option('--active/--inactive', 'is_active', default=None, help='Filter by is_active')
+    @click.option('--created-before', help='ISO 8601 datetime')
+    @click.option('--created-after', help='ISO 8601 datetime')
+    @click.option('--chunk-size', type=click.IntRange(1, MAX_CHUNK_SIZE), default=DEFAULT_CHUNK_SIZE)
+    @click.option('--yes', is_flag=True, help='Do not ask for confirmation')
+    def bulk_users_command(action, ids, username_prefix, is_active, created_before, created_after, chunk_size, yes):
+        """Bulk deactivate/reactivate/delete users: flask --app app bulk-users delete --id ..."""
+        filters = {
+            'username_prefix': username_prefix,
+            'is_active': is_active,
+            'created_before': created_before,
+            'created_after': created_after
+        }
+        filters = {key: value for key, value in filters.items() if value is not None}
+        try:
+            ids, filters = parse_selection(list(ids) or None, filters)
+        except InvalidBulkRequest as e:
+            raise click.UsageError(str(e))
+
+        if action == 'delete' and not yes:
+            click.confirm('Delete matching users with all their posts?', abort=True)
+
+        progress = None
+        for progress in run_bulk_action(db, action, ids, filters, chunk_size=chunk_size):
+            click.echo(f"{progress['processed']}/{progress['total']} processed, {progress['affected']} affected")
+        if progress is None:
+            click.echo('No matching users')
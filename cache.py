@@ -0,0 +1,405 @@
+import json
+import logging
+import os
+import random
+import re
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Кэш с подключаемыми бэкендами:
+#   memory://                - LRU в памяти процесса (свой у каждого воркера);
+#   sqlite:////path/cache.db - общий для воркеров на одной машине файл SQLite;
+#   redis://host:6379/0      - любой сервер с протоколом Redis (RESP).
+# Теги реализованы через версии: запись хранит версии своих тегов на момент
+# записи, invalidate_tags меняет версию - и все записи с этим тегом устаревают.
+
+_MISSING = object()
+
+class CacheError(Exception):
+    pass
+
+class MemoryBackend:
+    def __init__(self, max_entries=10000):
+        self._max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        result = []
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is None or (item[1] is not None and item[1] <= now):
+                    result.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    result.append(item[0])
+        return result
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > time.monotonic()):
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self, prefix):
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self._path = path
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS cache_entries '
+            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, keys):
+        placeholders = ','.join('?' * len(keys))
+        rows = dict(self._connection().execute(
+            f'SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) '  # nosec
+            'AND (expires_at IS NULL OR expires_at > ?)',
+            [*keys, time.time()]
+        ).fetchall())
+        return [rows.get(key) for key in keys]
+
+    def _expires(self, ttl):
+        return time.time() + ttl if ttl else None
+
+    def set(self, key, value, ttl=None):
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, value, self._expires(ttl))
+        )
+        # Изредка вычищаем просроченные записи
+        if random.random() < 0.01:  # nosec
+            connection.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),))
+
+    def add(self, key, value, ttl=None):
+        cursor = self._connection().execute(
+            'INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+            'WHERE cache_entries.expires_at IS NOT NULL AND cache_entries.expires_at <= ?',
+            (key, value, self._expires(ttl), time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def clear(self, prefix):
+        # substr, а не LIKE: в префиксе могут быть % и _
+        self._connection().execute(
+            'DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?', (len(prefix), prefix)
+        )
+
+class RedisBackend:
+    """
+    Минимальный клиент протокола Redis (RESP2): GET/MGET/SET/DEL/SCAN
+    """
+    SCAN_COUNT = 500
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=1.0):
+        self._address = (host, port)
+        self._db = db
+        self._password = password
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self._address, timeout=self._timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        if self._password:
+            self._call('AUTH', self._password)
+        if self._db:
+            self._call('SELECT', self._db)
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def _encode(self, args):
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(f'${len(data)}\r\n'.encode() + data + b'\r\n')
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode('utf-8')
+        if prefix == b'-':
+            raise CacheError(payload.decode('utf-8'))
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._local.reader.read(length + 2)[:-2]
+            return data.decode('utf-8')
+        if prefix == b'*':
+            count = int(payload)
+            return None if count == -1 else [self._read_reply() for _ in range(count)]
+        raise CacheError(f'Unexpected reply: {line!r}')
+
+    def _call(self, *args):
+        self._local.sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def execute(self, *args):
+        try:
+            if getattr(self._local, 'sock', None) is None:
+                self._connect()
+            return self._call(*args)
+        except OSError:
+            # Соединение могло устареть - переподключаемся один раз
+            self._close()
+        try:
+            self._connect()
+            return self._call(*args)
+        except OSError as e:
+            self._close()
+            raise CacheError(str(e))
+
+    def get_many(self, keys):
+        return self.execute('MGET', *keys)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.execute('SET', key, value, 'PX', int(ttl * 1000))
+        else:
+            self.execute('SET', key, value)
+
+    def add(self, key, value, ttl=None):
+        args = ['SET', key, value, 'NX']
+        if ttl:
+            args += ['PX', int(ttl * 1000)]
+        return self.execute(*args) == 'OK'
+
+    def delete(self, key):
+        self.execute('DEL', key)
+
+    def clear(self, prefix):
+        # Только свои ключи: база Redis может быть общей с другими приложениями
+        pattern = re.sub(r'([*?\[\]\\])', r'\\\1', prefix) + '*'
+        cursor = '0'
+        while True:
+            cursor, keys = self.execute('SCAN', cursor, 'MATCH', pattern, 'COUNT', self.SCAN_COUNT)
+            if keys:
+                self.execute('DEL', *keys)
+            if cursor == '0':
+                break
+
+def backend_from_url(url, max_entries=10000):
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        return MemoryBackend(max_entries)
+    if parsed.scheme == 'sqlite':
+        # sqlite:////abs/path.db или sqlite:///relative.db
+        return SQLiteBackend(parsed.path[1:] if parsed.path.startswith('//') else parsed.path.lstrip('/'))
+    if parsed.scheme == 'redis':
+        return RedisBackend(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip('/') or 0),
+            password=parsed.password
+        )
+    raise ValueError(f'Unsupported cache URL: {url}')
+
+class Cache:
+    """
+    Кэш приложения: cache = Cache(); cache.init_app(app)
+
+    get_or_set защищает от stampede: при промахе значение вычисляет один поток
+    в процессе (локальная блокировка) и один процесс среди воркеров
+    (блокировка через add в общем бэкенде), остальные ждут готового значения.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.enabled = False
+        self._locks = [threading.Lock() for _ in range(64)]
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['CACHE_ENABLED']
+        self.prefix = app.config['CACHE_KEY_PREFIX']
+        self.default_ttl = app.config['CACHE_DEFAULT_TTL']
+        self.lock_ttl = app.config['CACHE_LOCK_TTL']
+        self.backend = backend_from_url(app.config['CACHE_URL'], app.config['CACHE_MAX_ENTRIES'])
+        app.extensions['cache'] = self
+
+    def _key(self, key):
+        return f'{self.prefix}{key}'
+
+    def _tag_key(self, tag):
+        return f'{self.prefix}tag:{tag}'
+
+    def _tag_versions(self, tags):
+        """
+        Текущие версии тегов; отсутствующие (новые или вытесненные) создаются заново
+        """
+        if not tags:
+            return {}
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        versions = dict(zip(tags, self.backend.get_many(tag_keys)))
+        for tag, tag_key in zip(tags, tag_keys):
+            if versions[tag] is None:
+                version = _new_version()
+                if not self.backend.add(tag_key, version):
+                    version = self.backend.get_many([tag_key])[0] or version
+                versions[tag] = version
+        return versions
+
+    def _get(self, key):
+        raw = self.backend.get_many([self._key(key)])[0]
+        if raw is None:
+            return _MISSING
+        entry = json.loads(raw)
+        tags = entry.get('tags') or {}
+        if tags and self._tag_versions(list(tags)) != tags:
+            return _MISSING
+        return entry['value']
+
+    def get(self, key, default=None):
+        if not self.enabled:
+            return default
+        try:
+            value = self._get(key)
+        except (CacheError, OSError, sqlite3.Error) as e:
+            logger.warning("Cache get failed: %s", e)
+            return default
+        return default if value is _MISSING else value
+
+    def _store(self, key, value, ttl, versions):
+        entry = {'value': value, 'tags': versions}
+        self.backend.set(self._key(key), json.dumps(entry), ttl or self.default_ttl)
+
+    def set(self, key, value, ttl=None, tags=()):
+        if not self.enabled:
+            return
+        try:
+            self._store(key, value, ttl, self._tag_versions(list(tags)))
+        except (CacheError, OSError, sqlite3.Error) as e:
+            logger.warning("Cache set failed: %s", e)
+
+    def delete(self, key):
+        if not self.enabled:
+            return
+        try:
+            self.backend.delete(self._key(key))
+        except (CacheError, OSError, sqlite3.Error) as e:
+            logger.warning("Cache delete failed: %s", e)
+
+    def invalidate_tags(self, *tags):
+        if not self.enabled:
+            return
+        try:
+            for tag in tags:
+                self.backend.set(self._tag_key(tag), _new_version())
+        except (CacheError, OSError, sqlite3.Error) as e:
+            logger.warning("Cache invalidation failed: %s", e)
+
+    def clear(self):
+        """
+        Удаляет записи с префиксом CACHE_KEY_PREFIX, чужие ключи в общем бэкенде остаются
+        """
+        if self.backend is not None:
+            self.backend.clear(self.prefix)
+
+    def get_or_set(self, key, compute, ttl=None, tags=()):
+        if not self.enabled:
+            return compute()
+
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._locks[hash(key) % len(self._locks)]:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            lock_key = self._key(f'lock:{key}')
+            try:
+                leader = self.backend.add(lock_key, '1', self.lock_ttl)
+            except (CacheError, OSError, sqlite3.Error):
+                leader = True
+
+            if not leader:
+                # Значение уже вычисляет другой воркер - ждем его
+                deadline = time.monotonic() + self.lock_ttl
+                while time.monotonic() < deadline:
+                    time.sleep(0.02)
+                    value = self.get(key, _MISSING)
+                    if value is not _MISSING:
+                        return value
+
+            try:
+                # Версии тегов снимаются до вычисления: если тег инвалидируют,
+                # пока compute() читает БД, запись сразу окажется устаревшей
+                try:
+                    versions = self._tag_versions(list(tags))
+                except (CacheError, OSError, sqlite3.Error) as e:
+                    logger.warning("Cache get failed: %s", e)
+                    versions = None
+                value = compute()
+                if versions is not None:
+                    try:
+                        self._store(key, value, ttl, versions)
+                    except (CacheError, OSError, sqlite3.Error) as e:
+                        logger.warning("Cache set failed: %s", e)
+                return value
+            finally:
+                if leader:
+                    self.delete(f'lock:{key}')
+
+def _new_version():
+    return f'{time.time_ns():x}{os.getpid():x}{random.getrandbits(16):x}'  # nosec
+
+cache = Cache()
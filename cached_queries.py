@@ -0,0 +1,64 @@
+from flask import current_app
+
+import queries
+from cache import cache
+
+# Кэшируемые варианты read-запросов. Ключи и теги собраны в одном месте,
+# чтобы записи (create_post, register, админские операции) инвалидировали
+# ровно то, что могли изменить.
+# Ключи общие для всех клиентов и могут заполняться чтением с реплики, поэтому
+# клиент, закрепленный за основной БД после записи (read-your-writes), читает
+# мимо кэша и не заполняет его.
+
+USERS_TAG = 'users'
+POSTS_TAG = 'posts'
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+def _get_or_set(db, key, compute, **kwargs):
+    if db.session().pinned_to_primary():
+        return compute()
+    return cache.get_or_set(key, compute, **kwargs)
+
+def user_exists(db, user_id):
+    return _get_or_set(
+        db,
+        f'user_exists:{user_id}',
+        lambda: queries.user_exists(db, user_id),
+        tags=[user_tag(user_id)]
+    )
+
+def dashboard_stats(db, user_id):
+    return _get_or_set(
+        db,
+        f'stats:{user_id}',
+        lambda: queries.dashboard_stats(db, user_id),
+        ttl=current_app.config['CACHE_COUNTERS_TTL'],
+        tags=[USERS_TAG, POSTS_TAG]
+    )
+
+def recent_posts(db, limit=5):
+    return _get_or_set(
+        db,
+        f'recent_posts:{limit}',
+        lambda: queries.recent_posts(db, limit),
+        tags=[POSTS_TAG, USERS_TAG]
+    )
+
+def active_users(db):
+    return _get_or_set(db, 'active_users', lambda: queries.active_users(db), tags=[USERS_TAG])
+
+def current_user(db, user_id):
+    return _get_or_set(
+        db,
+        f'current_user:{user_id}',
+        lambda: queries.current_user(db, user_id),
+        tags=[user_tag(user_id)]
+    )
+
+def invalidate_posts():
+    cache.invalidate_tags(POSTS_TAG)
+
+def invalidate_users(*user_ids):
+    cache.invalidate_tags(USERS_TAG, *[user_tag(user_id) for user_id in user_ids])
@@ -0,0 +1,150 @@
+import logging
+import zlib
+
+import click
+import sqlalchemy as sa
+from sqlalchemy.types import Text, TypeDecorator
+
+from sharding import shards
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, без него доступен только zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Прозрачное сжатие длинных текстов. В SQLite колонка TEXT может хранить и BLOB,
+# поэтому схема не меняется: короткие значения остаются строками, длинные
+# пишутся как BLOB с однобайтным заголовком алгоритма. При чтении BLOB
+# распаковывается, строки возвращаются как есть - старые и новые строки
+# читаются одинаково, а миграция может идти порциями.
+
+# Таблицы с колонкой content типа CompressedText (для flask compress-posts)
+COMPRESSED_TABLES = ('posts', 'posts_archive')
+
+ZLIB = b'z'
+ZSTD = b's'
+
+_settings = {
+    'algorithm': 'zlib',
+    'threshold': 1024,
+    'level': 6
+}
+
+def configure(algorithm='zlib', threshold=1024, level=6):
+    if algorithm not in ('zlib', 'zstd'):
+        raise ValueError(f'Unsupported compression algorithm: {algorithm}')
+    if algorithm == 'zstd' and zstandard is None:
+        raise RuntimeError('zstd compression requires the zstandard package')
+    _settings.update(algorithm=algorithm, threshold=threshold, level=level)
+
+def compress(text):
+    """
+    Строка -> BLOB с заголовком, если она длиннее порога и сжатие выгодно, иначе строка
+    """
+    data = text.encode('utf-8')
+    if len(data) < _settings['threshold']:
+        return text
+    if _settings['algorithm'] == 'zstd':
+        packed = ZSTD + zstandard.ZstdCompressor(level=_settings['level']).compress(data)
+    else:
+        packed = ZLIB + zlib.compress(data, _settings['level'])
+    return packed if len(packed) < len(data) else text
+
+def decompress(value):
+    if not isinstance(value, (bytes, memoryview)):
+        return value
+    value = bytes(value)
+    header, payload = value[:1], value[1:]
+    if header == ZLIB:
+        return zlib.decompress(payload).decode('utf-8')
+    if header == ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstd-compressed value found, install the zstandard package')
+        return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+    raise ValueError(f'Unknown compression header: {header!r}')
+
+class CompressedText(TypeDecorator):
+    """
+    db.Column(CompressedText, nullable=False) - в Python всегда str
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        # Только SQLite хранит BLOB в текстовой колонке
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return compress(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress(value)
+
+def compress_existing(db, table_name, column_name, batch_size=1000):
+    """
+    Сжимает уже сохраненные строки длиннее порога, порциями по batch_size.
+    Генератор прогресса: (просмотрено, сжато). Можно прервать и повторить.
+    С шардингом проходит по всем шардам.
+    """
+    table = db.metadata.tables[table_name]
+    column = table.c[column_name]
+    pk = table.primary_key.columns.values()[0]
+    # Сырые значения без распаковки: проверяем тип и длину на стороне SQLite
+    raw = sa.type_coerce(column, sa.LargeBinary)
+    candidates = sa.and_(
+        sa.func.typeof(raw) == 'text',
+        sa.func.length(sa.cast(raw, sa.LargeBinary)) >= _settings['threshold']
+    )
+
+    scanned = compressed = 0
+    # С шардингом строки лежат в каждом шарде; без него - в основной БД
+    for _ in shards.each(db):
+        last_id = None
+        while True:
+            page = sa.select(pk, column).where(candidates).order_by(pk).limit(batch_size)
+            if last_id is not None:
+                page = page.where(pk > last_id)
+            rows = db.session.execute(page).all()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, text in rows:
+                if not isinstance(compress(text), str):
+                    updates.append({'_id': row_id, '_value': text})
+            if updates:
+                statement = sa.update(table).where(pk == sa.bindparam('_id')).values(
+                    {column_name: sa.bindparam('_value', type_=column.type)}
+                )
+                # onupdate (например, posts.updated_at) не должен срабатывать: содержимое не менялось
+                for other in table.columns:
+                    if other.onupdate is not None:
+                        statement = statement.values({other.name: other})
+                db.session.execute(statement, updates)
+            db.session.commit()
+
+            last_id = rows[-1][0]
+            scanned += len(rows)
+            compressed += len(updates)
+            yield scanned, compressed
+
+def init_compression(app, db):
+    configure(
+        algorithm=app.config['POST_COMPRESSION_ALGORITHM'],
+        threshold=app.config['POST_COMPRESSION_THRESHOLD'],
+        level=app.config['POST_COMPRESSION_LEVEL']
+    )
+
+    @app.cli.command('compress-posts')
+    @click.option('--batch-size', type=click.IntRange(1, 100000), default=1000)
+    def compress_posts_command(batch_size):
+        """Compress existing posts and archived posts above POST_COMPRESSION_THRESHOLD."""
+        for table_name in COMPRESSED_TABLES:
+            if table_name not in db.metadata.tables:
+                continue
+            scanned = compressed = 0
+            for scanned, compressed in compress_existing(db, table_name, 'content', batch_size):
+                click.echo(f'{table_name}: {scanned} scanned, {compressed} compressed')
+            logger.info("Compressed %s of %s rows in %s", compressed, scanned, table_name)
+            click.echo(f'Done: {compressed} of {scanned} candidate rows in {table_name} compressed')
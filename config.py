@@ -4,6 +4,11 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# URI реплик только для чтения через запятую
+_replica_urls = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+# URI шардов пользователей и постов через запятую (sharding.py)
+_shard_urls = [url for url in os.environ.get('DATABASE_SHARD_URLS', '').split(',') if url]
+
 class Config:
     # Основные настройки
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -12,10 +17,119 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Реплики для чтения (bind'ы replica_0, replica_1, ...)
+    SQLALCHEMY_BINDS = {
+        **{f'replica_{index}': url for index, url in enumerate(_replica_urls)},
+        # Шарды (bind'ы shard_0, shard_1, ...): пользователи и их посты
+        **{f'shard_{index}': url for index, url in enumerate(_shard_urls)}
+    }
+    # Сколько секунд после записи клиент читает из основной БД
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+    
+    # Инкрементальная синхронизация постов
+    SYNC_PAGE_SIZE = 500
+    SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    
+    # Server-Sent Events (на каждый воркер)
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_REPLAY_BUFFER_SIZE = 1000
+    SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 100))
+    
+    # ASGI-режим (asgi.py)
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+    ASYNC_DB_MAX_OVERFLOW = 20
+    ASYNC_BCRYPT_WORKERS = int(os.environ.get('ASYNC_BCRYPT_WORKERS', 4))
+    ASYNC_WSGI_THREADS = 10
+    
+    # Логирование
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_QUEUE_SIZE = 10000
+    # Доля логируемых обычных запросов и частых событий (login, post_created);
+    # ошибки и запросы дольше LOG_SLOW_REQUEST_MS логируются всегда
+    LOG_REQUEST_SAMPLE_RATE = float(os.environ.get('LOG_REQUEST_SAMPLE_RATE', 0.1))
+    LOG_EVENT_SAMPLE_RATE = float(os.environ.get('LOG_EVENT_SAMPLE_RATE', 1.0))
+    LOG_SLOW_REQUEST_MS = 500
+    
+    # Администраторы (по имени активного пользователя в БД)
+    ADMIN_USERNAMES = os.environ.get('ADMIN_USERNAMES', 'admin').split(',')
+    
+    # Профилирование запросов (profiling.py)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_MODE = os.environ.get('PROFILING_MODE', 'cprofile')  # cprofile или sampling
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01))
+    PROFILING_ENDPOINTS = ['get_data', 'login']
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', 'profiles')
+    PROFILING_MAX_FILES = 50
+    PROFILING_SAMPLING_INTERVAL = 0.005
+    PROFILING_TOKEN_MAX_AGE = 300
+    
+    # Кэш (cache.py): memory://, sqlite:////path/cache.db или redis://host:6379/0.
+    # По умолчанию - общий для воркеров файл: memory:// у каждого воркера свой,
+    # и инвалидация в одном воркере не видна остальным до истечения TTL
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_URL = os.environ.get('CACHE_URL', 'sqlite:///cache.db')
+    CACHE_KEY_PREFIX = 'app:'
+    CACHE_DEFAULT_TTL = 60
+    CACHE_COUNTERS_TTL = 10
+    CACHE_LOCK_TTL = 5
+    CACHE_MAX_ENTRIES = 10000
+    
+    # Фоновые задачи (jobs.py)
+    JOBS_DATABASE = os.environ.get('JOBS_DATABASE', 'jobs.db')
+    JOBS_EAGER = os.environ.get('JOBS_EAGER', 'false').lower() == 'true'  # выполнять сразу в enqueue (тесты)
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+    JOBS_MAX_ATTEMPTS = 5
+    JOBS_RETRY_BACKOFF = 2  # секунды, удваивается с каждой попыткой
+    JOBS_LOCK_TIMEOUT = 300
+    JOBS_POLL_INTERVAL = 1
+    
+    # Сжатие posts.content: zlib или zstd (нужен пакет zstandard), порог в байтах
+    POST_COMPRESSION_ALGORITHM = os.environ.get('POST_COMPRESSION_ALGORITHM', 'zlib')
+    POST_COMPRESSION_THRESHOLD = int(os.environ.get('POST_COMPRESSION_THRESHOLD', 1024))
+    POST_COMPRESSION_LEVEL = int(os.environ.get('POST_COMPRESSION_LEVEL', 6))
+    
+    # Архив постов: старше ARCHIVE_AFTER_DAYS и неопубликованные без изменений
+    # ARCHIVE_UNPUBLISHED_AFTER_DAYS дней (0 - не архивировать). ARCHIVE_INTERVAL -
+    # период фоновой задачи в секундах (0 - только командой flask archive-posts)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_UNPUBLISHED_AFTER_DAYS = int(os.environ.get('ARCHIVE_UNPUBLISHED_AFTER_DAYS', 90))
+    ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', 0))
+    ARCHIVE_BATCH_SIZE = 500
+    ARCHIVE_MAX_BATCHES = 20  # порций за один запуск задачи
+    
+    # Резервные копии SQLite (backup.py): BACKUP_INTERVAL - период в секундах (0 - выключено),
+    # BACKUP_KEEP - сколько последних копий хранить
+    BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+    BACKUP_INTERVAL = int(os.environ.get('BACKUP_INTERVAL', 0))
+    BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 7))
+    BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 256))
+    BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', 0.05))
+    BACKUP_MAX_RESTARTS = 5
+    
+    # Выгрузка таблиц (export.py): строк на странице (одна короткая транзакция чтения)
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+    
+    # POST /api/batch (batch.py): подзапросов в пакете и потоков для параллельных чтений
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+    BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+    # Потоковые и массовые эндпоинты в пакете не выполняются
+    BATCH_EXCLUDED_ENDPOINTS = ['batch', 'stream_posts', 'export', 'bulk_users']
+    
+    # Пробы /health и /ready (health.py): кэш результата SELECT 1, таймаут проверки БД
+    # и длина очереди bcrypt (ASGI-режим), при которой процесс считается перегруженным
+    READY_CACHE_SECONDS = float(os.environ.get('READY_CACHE_SECONDS', 2))
+    READY_DB_TIMEOUT = float(os.environ.get('READY_DB_TIMEOUT', 1))
+    READY_MAX_BCRYPT_QUEUE = int(os.environ.get('READY_MAX_BCRYPT_QUEUE', 50))
+    
+    # Стоимость bcrypt (2^N итераций); в тестах снижается до минимума
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    
     # JWT настройки
     JWT_SECRET_KEY = SECRET_KEY
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_TOKEN_LOCATION = ['headers']
+    # LRU проверенных токенов в каждом процессе, 0 - выключить
+    JWT_DECODE_CACHE_SIZE = int(os.environ.get('JWT_DECODE_CACHE_SIZE', 10000))
     
     # CORS настройки
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000', 'http://frontend:3000']
@@ -30,4 +144,8 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_BINDS = {}
+    JOBS_EAGER = True
+    CACHE_URL = os.environ.get('CACHE_URL', 'memory://')  # один процесс
+    BCRYPT_LOG_ROUNDS = 4
\ No newline at end of file
@@ -0,0 +1,120 @@
+import json
+import queue
+import uuid
+from collections import deque
+from threading import Lock
+
+# In-process pub/sub для Server-Sent Events.
+# Хаб живет в памяти воркера: id событий имеют вид "<boot_id>-<seq>",
+# поэтому переподключение к другому воркеру распознается и клиент получает reset.
+
+class TooManySubscribers(Exception):
+    pass
+
+def format_sse(data, event=None, event_id=None):
+    """
+    Сообщение в формате text/event-stream
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    lines.extend(f'data: {line}' for line in payload.splitlines())
+    return '\n'.join(lines) + '\n\n'
+
+class Subscription:
+    def __init__(self, hub, queue_size):
+        self._hub = hub
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+        self.closed = False
+
+    def _deliver(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # Медленный клиент: отключаем, он переподключится с Last-Event-ID
+            self.overflowed = True
+            self._hub.unsubscribe(self)
+
+    def get(self, timeout):
+        """
+        Следующее сообщение или None по таймауту (время для heartbeat)
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._hub.unsubscribe(self)
+
+class EventHub:
+    def __init__(self, replay_size=1000, max_subscribers=100, queue_size=256):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.max_subscribers = max_subscribers
+        self._queue_size = queue_size
+        self._seq = 0
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self._lock = Lock()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event, data):
+        with self._lock:
+            self._seq += 1
+            event_id = f'{self.boot_id}-{self._seq}'
+            message = format_sse(data, event=event, event_id=event_id)
+            self._replay.append((self._seq, message))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._deliver(message)
+        return event_id
+
+    def subscribe(self, last_event_id=None):
+        """
+        Новая подписка и список сообщений для досылки после last_event_id.
+        Если событие уже вытеснено из буфера или пришло от другого воркера,
+        вместо досылки отдается событие reset.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers('Too many subscribers')
+
+            subscription = Subscription(self, self._queue_size)
+            self._subscribers.add(subscription)
+            backlog = self._backlog(last_event_id) if last_event_id else []
+
+        return subscription, backlog
+
+    def clear(self):
+        """
+        Отключает всех подписчиков и очищает буфер досылки. Новый boot_id:
+        старые Last-Event-ID получат reset.
+        """
+        with self._lock:
+            for subscription in self._subscribers:
+                subscription.closed = True
+            self._subscribers.clear()
+            self._replay.clear()
+            self._seq = 0
+            self.boot_id = uuid.uuid4().hex[:8]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscription.closed = True
+            self._subscribers.discard(subscription)
+
+    def _backlog(self, last_event_id):
+        boot_id, _, seq = last_event_id.partition('-')
+        oldest = self._replay[0][0] if self._replay else self._seq + 1
+
+        if boot_id != self.boot_id or not seq.isdigit() or int(seq) < oldest - 1:
+            return [format_sse({'reason': 'replay unavailable'}, event='reset')]
+
+        return [message for event_seq, message in self._replay if event_seq > int(seq)]
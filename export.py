@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import logging
+import sys
+import zlib
+from datetime import datetime
+
+import click
+import sqlalchemy as sa
+from flask import Response, jsonify, request, stream_with_context
+
+from admin import admin_required
+from sharding import shards
+
+logger = logging.getLogger(__name__)
+
+# Выгрузка таблиц для аналитики: строки читаются страницами по первичному ключу
+# (keyset), каждая страница - короткая транзакция, поэтому медленный клиент
+# не держит блокировку чтения SQLite и не мешает записи. Строки сразу пишутся
+# в ответ или файл как NDJSON или CSV, при необходимости через gzip. Память не
+# зависит от размера таблицы. Выгрузка не является снимком: строки, записанные
+# во время выгрузки, могут в нее попасть или нет. Хэши паролей не выгружаются.
+
+FORMATS = ('ndjson', 'csv')
+DEFAULT_CHUNK_SIZE = 1000
+# Размер куска вывода: мелкие строки склеиваются перед отправкой
+FLUSH_BYTES = 64 * 1024
+
+# Имя выгрузки -> (таблица, колонка для фильтра по времени, исключенные колонки)
+EXPORTS = {
+    'users': ('users', 'created_at', ('password_hash',)),
+    'profiles': ('user_profiles', 'updated_at', ()),
+    'posts': ('posts', 'created_at', ())
+}
+
+class InvalidExport(ValueError):
+    pass
+
+def _parse_datetime(value, field):
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidExport(f'{field} must be an ISO 8601 datetime')
+
+def export_query(db, name, created_after=None, created_before=None):
+    if name not in EXPORTS:
+        raise InvalidExport(f"Unknown export, available: {', '.join(EXPORTS)}")
+    table_name, time_column, excluded = EXPORTS[name]
+    table = db.metadata.tables[table_name]
+    created_after = _parse_datetime(created_after, 'created_after')
+    created_before = _parse_datetime(created_before, 'created_before')
+
+    query = sa.select(*[column for column in table.columns if column.name not in excluded])
+    if created_after is not None:
+        query = query.where(table.c[time_column] >= created_after)
+    if created_before is not None:
+        query = query.where(table.c[time_column] < created_before)
+    return query
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _lines(rows, fmt, columns):
+    if fmt == 'ndjson':
+        for row in rows:
+            yield json.dumps({key: _value(value) for key, value in row._mapping.items()}, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def export_chunks(db, name, fmt='ndjson', created_after=None, created_before=None, compress=False,
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Генератор кусков bytes (до FLUSH_BYTES, gzip при compress=True)
+    """
+    if fmt not in FORMATS:
+        raise InvalidExport(f"format must be one of: {', '.join(FORMATS)}")
+    query = export_query(db, name, created_after, created_before)
+    columns = [column.name for column in query.selected_columns]
+    table = db.metadata.tables[EXPORTS[name][0]]
+    # wbits=31 - формат gzip, а не "голый" zlib
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    pending = []
+    size = 0
+    for line in _lines(shards.stream(db, query, table.c.id, page_size=chunk_size), fmt, columns):
+        data = line.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            chunk = b''.join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+def init_export(app, db):
+    chunk_size = app.config['EXPORT_CHUNK_SIZE']
+
+    @app.route('/admin/export/<name>', methods=['GET'])
+    @admin_required
+    def export(name):
+        """
+        ?format=ndjson|csv&created_after=...&created_before=...&gzip=true
+        """
+        fmt = request.args.get('format', 'ndjson')
+        compress = request.args.get('gzip', 'false').lower() == 'true'
+        try:
+            if fmt not in FORMATS:
+                raise InvalidExport(f"format must be one of: {', '.join(FORMATS)}")
+            # Запрос проверяется до начала ответа, чтобы ошибка пришла со статусом 400
+            export_query(db, name, request.args.get('created_after'), request.args.get('created_before'))
+        except InvalidExport as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        chunks = export_chunks(
+            db, name, fmt,
+            request.args.get('created_after'),
+            request.args.get('created_before'),
+            compress=compress,
+            chunk_size=chunk_size
+        )
+        filename = f"{name}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{fmt}" + ('.gz' if compress else '')
+        logger.info("Export of %s started", name, extra={'event': 'export', 'export': name, 'format': fmt})
+        return Response(
+            stream_with_context(chunks),
+            mimetype='application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson'),
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    @app.cli.command('export')
+    @click.argument('name', type=click.Choice(list(EXPORTS)))
+    @click.option('--format', 'fmt', type=click.Choice(FORMATS), default='ndjson', show_default=True)
+    @click.option('--created-after', help='ISO 8601 datetime')
+    @click.option('--created-before', help='ISO 8601 datetime')
+    @click.option('--gzip', 'compress', is_flag=True, help='Compress the output with gzip')
+    @click.option('--output', '-o', type=click.Path(dir_okay=False), help='Output file (default: stdout)')
+    @click.option('--chunk-size', type=click.IntRange(1, 100000), default=chunk_size)
+    def export_command(name, fmt, created_after, created_before, compress, output, chunk_size):
+        """Stream users, profiles or posts as NDJSON/CSV."""
+        try:
+            export_query(db, name, created_after, created_before)
+        except InvalidExport as e:
+            raise click.UsageError(str(e))
+
+        chunks = export_chunks(db, name, fmt, created_after, created_before, compress, chunk_size)
+        target = open(output, 'wb') if output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                target.write(chunk)
+        finally:
+            if output:
+                target.close()
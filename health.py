@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import sqlalchemy as sa
+from flask import g, jsonify, request
+
+# Пробы для оркестратора. /health (liveness) не делает ввода-вывода: процесс
+# жив, если отвечает. /ready (readiness) проверяет базы через SELECT 1 с коротким
+# таймаутом и сообщает загрузку пулов соединений и задержку последних запросов;
+# результат кэшируется на READY_CACHE_SECONDS, чтобы частые пробы не нагружали БД.
+# При недоступной базе или исчерпанном пуле /ready отвечает 503.
+
+PROBE_PATHS = ('/health', '/ready')
+
+class LatencyWindow:
+    """
+    Длительности последних size запросов для p50/p95
+    """
+
+    def __init__(self, size=1000):
+        self._durations = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._durations.append(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._durations.clear()
+
+    def snapshot(self):
+        with self._lock:
+            durations = sorted(self._durations)
+        if not durations:
+            return {'count': 0, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+
+        def percentile(fraction):
+            return round(durations[min(int(len(durations) * fraction), len(durations) - 1)] * 1000, 2)
+
+        return {
+            'count': len(durations),
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(durations[-1] * 1000, 2)
+        }
+
+latency = LatencyWindow()
+
+def pool_status(engine):
+    """
+    Загрузка QueuePool: соединений выдано и доступно до исчерпания
+    """
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout'):
+        # NullPool/StaticPool (например, :memory:) не ограничивают соединения
+        return {'checked_out': None, 'saturated': False}
+    size = pool.size()
+    checked_out = pool.checkedout()
+    # max_overflow=-1 - без ограничения
+    max_overflow = getattr(pool, '_max_overflow', 0)
+    limit = None if max_overflow < 0 else size + max_overflow
+    return {
+        'size': size,
+        'checked_out': checked_out,
+        'overflow': max(pool.overflow(), 0),
+        'limit': limit,
+        'saturated': limit is not None and checked_out >= limit
+    }
+
+def engine_name(key):
+    return key or 'primary'
+
+class ReadinessCheck:
+    """
+    SELECT 1 во всех базах с таймаутом, результат кэшируется на ttl секунд
+    """
+
+    def __init__(self, ttl=2, timeout=1):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result = None
+        self._expires = 0
+        self._lock = threading.Lock()
+        # Зависший запрос занимает поток пула, а не обработчик пробы
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ready')
+
+    @staticmethod
+    def _ping(engine):
+        started = time.perf_counter()
+        with engine.connect() as connection:
+            connection.execute(sa.text('SELECT 1'))
+        return (time.perf_counter() - started) * 1000
+
+    def _run(self, engines):
+        futures = {name: self._executor.submit(self._ping, engine) for name, engine in engines.items()}
+        deadline = time.monotonic() + self.timeout
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = {'ok': True, 'latency_ms': round(future.result(max(deadline - time.monotonic(), 0)), 2)}
+            except FutureTimeout:
+                results[name] = {'ok': False, 'error': f'timeout after {self.timeout}s'}
+            except Exception as e:
+                results[name] = {'ok': False, 'error': str(e)}
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._result = None
+            self._expires = 0
+
+    def databases(self, engines):
+        with self._lock:
+            if self._result is None or time.monotonic() >= self._expires:
+                self._result = self._run(engines)
+                self._expires = time.monotonic() + self.ttl
+            return self._result
+
+def readiness_report(databases, pools, bcrypt_queue=None, max_bcrypt_queue=None):
+    """
+    (отчет, готов ли процесс принимать трафик)
+    """
+    ready = all(result['ok'] for result in databases.values()) and \
+        not any(pool['saturated'] for pool in pools.values())
+    if bcrypt_queue is not None and max_bcrypt_queue and bcrypt_queue >= max_bcrypt_queue:
+        ready = False
+    return {
+        'status': 'ready' if ready else 'not_ready',
+        'databases': databases,
+        'pools': pools,
+        'bcrypt_queue': bcrypt_queue,
+        'latency': latency.snapshot()
+    }, ready
+
+def init_health(app, db):
+    config = app.config
+    readiness = ReadinessCheck(ttl=config['READY_CACHE_SECONDS'], timeout=config['READY_DB_TIMEOUT'])
+    app.extensions['readiness'] = readiness
+
+    @app.before_request
+    def start_latency_timer():
+        g.latency_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop('latency_started', None)
+        if started is not None and request.path not in PROBE_PATHS:
+            latency.add(time.perf_counter() - started)
+        return response
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        return jsonify({
+            'success': True,
+            'message': 'Alive'
+        }), 200
+
+    @app.route('/ready', methods=['GET'])
+    def ready():
+        engines = {engine_name(key): engine for key, engine in db.engines.items()}
+        report, is_ready = readiness_report(
+            readiness.databases(engines),
+            {name: pool_status(engine) for name, engine in engines.items()}
+        )
+        return jsonify({
+            'success': is_ready,
+            'message': 'Ready' if is_ready else 'Not ready',
+            'data': report
+        }), 200 if is_ready else 503
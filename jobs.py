@@ -0,0 +1,245 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Фоновые задачи внутри процесса: очередь хранится в отдельном файле SQLite
+# (переживает перезапуск и общая для всех воркеров), задачи выполняет пул потоков.
+# Задача, упавшая с исключением, повторяется с экспоненциальной задержкой;
+# задача, "зависшая" в running дольше JOBS_LOCK_TIMEOUT (воркер умер), берется заново.
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    locked_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_run_at ON jobs (status, run_at);
+'''
+
+class JobQueue:
+    """
+    jobs = JobQueue(); jobs.init_app(app)
+
+        @jobs.task('send_email')
+        def send_email(user_id): ...
+
+        jobs.enqueue('send_email', user_id=user.id)
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._tasks = {}
+        self._schedules = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.path = app.config['JOBS_DATABASE']
+        self.eager = app.config['JOBS_EAGER']
+        self.workers = app.config['JOBS_WORKERS']
+        self.max_attempts = app.config['JOBS_MAX_ATTEMPTS']
+        self.backoff = app.config['JOBS_RETRY_BACKOFF']
+        self.lock_timeout = app.config['JOBS_LOCK_TIMEOUT']
+        self.poll_interval = app.config['JOBS_POLL_INTERVAL']
+        if not self.eager:
+            self._connection().executescript(_SCHEMA)
+            # Воркеры стартуют в каждом процессе при первом запросе (после fork в gunicorn)
+            app.before_request(self.start)
+        app.extensions['jobs'] = self
+
+    def task(self, name):
+        def decorator(fn):
+            self._tasks[name] = fn
+            return fn
+        return decorator
+
+    def schedule(self, name, interval):
+        """
+        Периодическая задача: раз в interval секунд в одном из воркеров.
+        В очереди всегда не больше одного экземпляра; следующий ставится,
+        когда текущий завершился (успешно или исчерпав попытки).
+        """
+        self._schedules[name] = interval
+
+    def _enqueue_once(self, name, delay=0):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            pending = connection.execute(
+                "SELECT 1 FROM jobs WHERE name = ? AND status IN ('queued', 'running') LIMIT 1", (name,)
+            ).fetchone()
+            if pending is None:
+                connection.execute(
+                    'INSERT INTO jobs (name, payload, max_attempts, run_at, created_at) VALUES (?, ?, ?, ?, ?)',
+                    (name, '{}', self.max_attempts, now + delay, now)
+                )
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, name, max_attempts=None, delay=0, **payload):
+        """
+        Ставит задачу в очередь. Вызывать после commit основной записи.
+        """
+        if name not in self._tasks:
+            raise ValueError(f'Unknown job: {name}')
+
+        if self.eager:
+            self._run(name, payload)
+            return None
+
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO jobs (name, payload, max_attempts, run_at, created_at) VALUES (?, ?, ?, ?, ?)',
+            (name, json.dumps(payload), max_attempts or self.max_attempts, now + delay, now)
+        )
+        self.start()
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def start(self):
+        if self._threads or self.eager:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for name in self._schedules:
+                self._enqueue_once(name)
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'jobs-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND run_at <= ?) "
+                "OR (status = 'running' AND locked_at < ?) ORDER BY run_at LIMIT 1",
+                (now, now - self.lock_timeout)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', locked_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (now, row['id'])
+                )
+            connection.execute('COMMIT')
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+        return row
+
+    def _run(self, name, payload):
+        with self.app.app_context():
+            self._tasks[name](**payload)
+
+    def _finish(self, job, error=None):
+        connection = self._connection()
+        attempts = job['attempts'] + 1
+
+        if error is None:
+            connection.execute('DELETE FROM jobs WHERE id = ?', (job['id'],))
+        elif attempts < job['max_attempts']:
+            delay = self.backoff * 2 ** (attempts - 1) * (1 + random.random() * 0.2)  # nosec
+            connection.execute(
+                "UPDATE jobs SET status = 'queued', run_at = ?, locked_at = NULL, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, job['id'])
+            )
+            return
+        else:
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', locked_at = NULL, last_error = ? WHERE id = ?",
+                (error, job['id'])
+            )
+            logger.error("Job %s #%s failed after %s attempts: %s", job['name'], job['id'], attempts, error)
+
+        if job['name'] in self._schedules:
+            self._enqueue_once(job['name'], self._schedules[job['name']])
+
+    def run_next(self):
+        """
+        Берет и выполняет одну готовую задачу. False, если готовых задач нет.
+        """
+        job = self._claim()
+        if job is None:
+            return False
+
+        try:
+            if job['name'] not in self._tasks:
+                raise LookupError(f"Unknown job: {job['name']}")
+            self._run(job['name'], json.loads(job['payload']))
+            error = None
+        except Exception as e:
+            logger.warning("Job %s #%s attempt %s failed: %s", job['name'], job['id'], job['attempts'] + 1, e)
+            error = f'{type(e).__name__}: {e}'
+        self._finish(job, error)
+        return True
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_next()
+            except sqlite3.Error as e:
+                logger.warning("Job queue unavailable: %s", e)
+                ran = False
+
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def clear(self):
+        """
+        Останавливает воркеры и удаляет все задачи из очереди
+        """
+        self.stop()
+        self._connection().executescript(_SCHEMA + 'DELETE FROM jobs;')
+
+    def stats(self):
+        """
+        Число задач по статусам (для мониторинга)
+        """
+        if self.eager:
+            return {}
+        rows = self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+jobs = JobQueue()
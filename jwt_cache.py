@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from flask_jwt_extended import JWTManager
+
+# Клиенты предъявляют один и тот же токен (действует JWT_ACCESS_TOKEN_EXPIRES)
+# на каждом запросе. Проверенные токены запоминаются в LRU: дайджест токена ->
+# декодированные claims. Повторный запрос пропускает разбор base64/JSON и HMAC.
+# Проверки после декодирования (тип токена, блоклист через
+# token_in_blocklist_loader, fresh) Flask-JWT-Extended выполняет как обычно.
+
+class TokenCache:
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(encoded_token):
+        # В памяти хранится дайджест, а не сам токен
+        return hashlib.blake2b(encoded_token.encode('utf-8'), digest_size=32).digest()
+
+    def get(self, key, leeway=0):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            claims, expires_at = item
+            if expires_at is not None and expires_at + leeway <= time.time():
+                # Истекший токен декодируется заново, чтобы получить штатную ошибку
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return dict(claims)
+
+    def set(self, key, claims):
+        with self._lock:
+            self._data[key] = (dict(claims), claims.get('exp'))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+class CachingJWTManager(JWTManager):
+    """
+    JWTManager с кэшем проверенных токенов (JWT_DECODE_CACHE_SIZE, 0 - выключен).
+    Через _decode_jwt_from_config проходят и @jwt_required, и decode_token.
+    """
+
+    def __init__(self, app=None, add_context_processor=False):
+        self.token_cache = TokenCache()
+        self._leeway = 0
+        super().__init__(app, add_context_processor)
+
+    def init_app(self, app, add_context_processor=False):
+        super().init_app(app, add_context_processor)
+        self.token_cache = TokenCache(app.config['JWT_DECODE_CACHE_SIZE'])
+        leeway = app.config['JWT_DECODE_LEEWAY']
+        self._leeway = leeway.total_seconds() if isinstance(leeway, timedelta) else leeway
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # CSRF-значение и allow_expired меняют результат проверки - такие вызовы не кэшируем
+        if csrf_value or allow_expired or not self.token_cache.max_entries:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        key = self.token_cache.digest(encoded_token)
+        claims = self.token_cache.get(key, self._leeway)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token)
+            self.token_cache.set(key, claims)
+        return claims
@@ -1,11 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_bcrypt import Bcrypt
 from datetime import datetime
 import uuid
+from compression import CompressedText
+from replicas import RoutingSession
+from schema import sqlite_foreign_keys
+from sync import post_change_triggers
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 
+# SQLite: внешние ключи и ON DELETE CASCADE включаются на каждом соединении
+event.listen(Engine, 'connect', sqlite_foreign_keys)
+
 def generate_uuid():
     return str(uuid.uuid4())
 
@@ -20,8 +29,8 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     # Связи
-    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan')
-    profiles = db.relationship('UserProfile', backref='user', uselist=False, cascade='all, delete-orphan')
+    posts = db.relationship('Post', backref='author', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    profiles = db.relationship('UserProfile', backref='user', uselist=False, cascade='all, delete-orphan', passive_deletes=True)
     
     def set_password(self, password):
         self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
@@ -45,7 +54,7 @@ class UserProfile(db.Model):
     __tablename__ = 'user_profiles'
     
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     first_name = db.Column(db.String(50))
     last_name = db.Column(db.String(50))
     bio = db.Column(db.Text)
@@ -65,11 +74,20 @@ class UserProfile(db.Model):
 
 class Post(db.Model):
     __tablename__ = 'posts'
+    __table_args__ = (
+        # Keyset-пагинация по (created_at, id): общая лента и посты автора
+        db.Index('ix_posts_published_created', 'is_published', 'created_at', 'id'),
+        db.Index('ix_posts_user_created', 'user_id', 'created_at', 'id'),
+        # Посты автора с фильтром is_published (опубликованные / свои черновики)
+        db.Index('ix_posts_user_published_created', 'user_id', 'is_published', 'created_at', 'id'),
+        # Архивирование снятых с публикации по updated_at (archive.py)
+        db.Index('ix_posts_updated', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    content = db.Column(CompressedText, nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_published = db.Column(db.Boolean, default=True)
@@ -87,4 +105,47 @@ class Post(db.Model):
         }
     
     def __repr__(self):
-        return f'<Post {self.title}>'
\ No newline at end of file
+        return f'<Post {self.title}>'
+
+class ArchivedPost(db.Model):
+    __tablename__ = 'posts_archive'
+    __table_args__ = (
+        # Для ON DELETE CASCADE при удалении пользователя
+        db.Index('ix_posts_archive_user', 'user_id'),
+    )
+    
+    # Холодные посты, переносятся из posts задачей archive_posts (archive.py)
+    id = db.Column(db.String(36), primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(CompressedText, nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    is_published = db.Column(db.Boolean)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class PostChange(db.Model):
+    __tablename__ = 'post_change_log'
+    __table_args__ = (
+        db.Index('ix_post_change_log_deleted', 'deleted_at'),
+        {'sqlite_autoincrement': True}
+    )
+    
+    # Журнал для синхронизации (sync.py), заполняется триггерами trg_posts_change_*:
+    # одна строка на пост, seq - номер последнего изменения, deleted_at - время удаления
+    seq = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.String(36), unique=True, nullable=False)
+    user_id = db.Column(db.String(36), nullable=False)
+    deleted_at = db.Column(db.DateTime)
+
+class UserDirectory(db.Model):
+    __tablename__ = 'user_directory'
+    
+    # Справочник шардов (sharding.py), хранится только в основной БД
+    id = db.Column(db.String(36), primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    shard = db.Column(db.String(20), nullable=False)
+
+for trigger in post_change_triggers:
+    event.listen(Post.__table__, 'after_create', trigger)
\ No newline at end of file
@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+# Keyset-пагинация по (created_at, id): курсор хранит ключ последней
+# записи страницы, следующая страница начинается строго после него
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_token(values):
+    """
+    Непрозрачный токен (base64 от JSON) для курсоров и токенов синхронизации
+    """
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_token(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+def encode_cursor(created_at, record_id):
+    """
+    Непрозрачный курсор из ключа сортировки
+    """
+    return encode_token([created_at.isoformat(), record_id])
+
+def decode_cursor(cursor):
+    """
+    Курсор -> (created_at, id); InvalidCursor, если курсор поврежден
+    """
+    try:
+        created_at, record_id = decode_token(cursor)
+        return datetime.fromisoformat(created_at), str(record_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+def parse_page_size(value):
+    """
+    Размер страницы из query string, ограниченный MAX_PAGE_SIZE
+    """
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if size < 1:
+        raise ValueError('limit must be positive')
+    return min(size, MAX_PAGE_SIZE)
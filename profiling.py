@@ -0,0 +1,209 @@
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, has_request_context, jsonify, request, send_from_directory
+from itsdangerous import BadSignature, TimestampSigner
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from admin import admin_required
+
+# Профилирование отдельных запросов без передеплоя:
+#  - по конфигу: PROFILING_SAMPLE_RATE запросов к PROFILING_ENDPOINTS;
+#  - по подписанному заголовку X-Profile (токен из make_profile_token).
+# Результат (cProfile .prof или свернутые стеки .folded) и метаданные с SQL
+# пишутся в PROFILING_DIR, хранятся последние PROFILING_MAX_FILES профилей.
+
+PROFILE_HEADER = 'X-Profile'
+_SIGNER_SALT = 'request-profiling'
+
+def _signer(app):
+    return TimestampSigner(app.config['SECRET_KEY'], salt=_SIGNER_SALT)
+
+def make_profile_token(app):
+    """
+    Токен для заголовка X-Profile, действует PROFILING_TOKEN_MAX_AGE секунд
+    """
+    return _signer(app).sign(b'profile').decode('ascii')
+
+def _header_requested(app):
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return False
+    try:
+        _signer(app).unsign(token, max_age=app.config['PROFILING_TOKEN_MAX_AGE'])
+        return True
+    except BadSignature:
+        return False
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик: раз в interval секунд снимает стек потока запроса
+    """
+    def __init__(self, thread_id, interval):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self.stacks = Counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        # Формат collapsed stacks (flamegraph.pl, speedscope)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+def _record_sql(conn, cursor, statement, parameters, context, executemany):
+    state = g.get('_profiling') if has_request_context() else None
+    if state is not None:
+        state['sql'].append({'statement': statement, 'started': time.perf_counter()})
+
+def _record_sql_end(conn, cursor, statement, parameters, context, executemany):
+    state = g.get('_profiling') if has_request_context() else None
+    if state is not None and state['sql']:
+        entry = state['sql'][-1]
+        entry['duration_ms'] = round((time.perf_counter() - entry.pop('started')) * 1000, 3)
+
+def _rotate(directory, max_profiles):
+    metas = sorted(
+        (name for name in os.listdir(directory) if name.endswith('.json')),
+        key=lambda name: os.path.getmtime(os.path.join(directory, name)),
+        reverse=True
+    )
+    for name in metas[max_profiles:]:
+        profile_id = name[:-len('.json')]
+        for suffix in ('.json', '.prof', '.folded'):
+            path = os.path.join(directory, profile_id + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+def _list_profiles(directory):
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                meta = json.load(f)
+            meta.pop('sql', None)
+            profiles.append(meta)
+    return sorted(profiles, key=lambda meta: meta['started_at'], reverse=True)
+
+def init_profiling(app):
+    directory = os.path.abspath(app.config['PROFILING_DIR'])
+
+    event.listen(Engine, 'before_cursor_execute', _record_sql)
+    event.listen(Engine, 'after_cursor_execute', _record_sql_end)
+
+    @app.before_request
+    def start_profiling():
+        forced = _header_requested(app)
+        sampled = (
+            app.config['PROFILING_ENABLED']
+            and request.endpoint in app.config['PROFILING_ENDPOINTS']
+            and random.random() < app.config['PROFILING_SAMPLE_RATE']  # nosec
+        )
+        if not (forced or sampled):
+            return
+
+        mode = app.config['PROFILING_MODE']
+        if mode == 'sampling':
+            profiler = StackSampler(threading.get_ident(), app.config['PROFILING_SAMPLING_INTERVAL'])
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # В этом потоке уже работает другой профилировщик
+                return
+
+        g._profiling = {
+            'mode': mode,
+            'profiler': profiler,
+            'sql': [],
+            'started': time.perf_counter(),
+            'started_at': datetime.utcnow().isoformat()
+        }
+
+    @app.after_request
+    def finish_profiling(response):
+        state = g.pop('_profiling', None)
+        if state is None:
+            return response
+
+        profiler = state['profiler']
+        if state['mode'] == 'sampling':
+            profiler.stop()
+        else:
+            profiler.disable()
+
+        os.makedirs(directory, exist_ok=True)
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}_{request.endpoint or 'unknown'}"
+        if state['mode'] == 'sampling':
+            profile_file = profile_id + '.folded'
+            profiler.dump(os.path.join(directory, profile_file))
+        else:
+            profile_file = profile_id + '.prof'
+            profiler.dump_stats(os.path.join(directory, profile_file))
+
+        meta = {
+            'id': profile_id,
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'request_id': g.get('request_id'),
+            'started_at': state['started_at'],
+            'duration_ms': round((time.perf_counter() - state['started']) * 1000, 3),
+            'mode': state['mode'],
+            'files': [profile_file, profile_id + '.json'],
+            'sql_count': len(state['sql']),
+            'sql': state['sql']
+        }
+        with open(os.path.join(directory, profile_id + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        _rotate(directory, app.config['PROFILING_MAX_FILES'])
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.route('/admin/profiles', methods=['GET'])
+    @admin_required
+    def list_profiles():
+        return jsonify({
+            'success': True,
+            'message': 'Profiles retrieved successfully',
+            'data': _list_profiles(directory)
+        }), 200
+
+    @app.route('/admin/profiles/<path:filename>', methods=['GET'])
+    @admin_required
+    def download_profile(filename):
+        # send_from_directory не выпускает за пределы каталога
+        return send_from_directory(directory, filename, as_attachment=True)
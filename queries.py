@@ -0,0 +1,267 @@
+import sqlalchemy as sa
+from pagination import encode_cursor
+from sharding import merge_sorted, shards
+
+# Read-only запросы через SQLAlchemy Core: выбираем только нужные колонки
+# и сразу собираем словари для ответа, без ORM-объектов и identity map
+
+def _tables(db):
+    return db.metadata.tables
+
+def post_row_to_dict(row):
+    """
+    Строка поста -> словарь в формате Post.to_dict()
+    """
+    return {
+        'id': row.id,
+        'title': row.title,
+        'content': row.content,
+        'user_id': row.user_id,
+        'author_username': row.author_username,
+        'created_at': row.created_at.isoformat(),
+        'updated_at': row.updated_at.isoformat(),
+        'is_published': row.is_published
+    }
+
+def post_columns(db):
+    """
+    Колонки поста + имя автора (для select с outer join на users)
+    """
+    posts = _tables(db)['posts']
+    users = _tables(db)['users']
+    return [
+        posts.c.id,
+        posts.c.title,
+        posts.c.content,
+        posts.c.user_id,
+        users.c.username.label('author_username'),
+        posts.c.created_at,
+        posts.c.updated_at,
+        posts.c.is_published
+    ]
+
+def select_posts(db):
+    """
+    Базовый select постов с автором, к нему добавляются фильтры и сортировка
+    """
+    posts = _tables(db)['posts']
+    users = _tables(db)['users']
+    return sa.select(*post_columns(db)).select_from(
+        posts.outerjoin(users, users.c.id == posts.c.user_id)
+    )
+
+# *_query строят запрос, парные функции выполняют его через db.session
+# (с шардингом - в шарде пользователя или во всех шардах, см. sharding.py).
+# Асинхронный режим (asgi.py) выполняет те же запросы через async engine.
+
+def user_exists_query(db, user_id):
+    users = _tables(db)['users']
+    return sa.select(users.c.id).where(users.c.id == user_id)
+
+def user_exists(db, user_id):
+    return bool(shards.execute(db, user_exists_query(db, user_id), user_id=user_id))
+
+def dashboard_stats_query(db, user_id):
+    """
+    Статистика для /api/data одним запросом вместо трех COUNT
+    """
+    users = _tables(db)['users']
+    posts = _tables(db)['posts']
+    return sa.select(
+        sa.select(sa.func.count()).select_from(users).scalar_subquery().label('total_users'),
+        sa.select(sa.func.count()).select_from(posts).scalar_subquery().label('total_posts'),
+        sa.select(sa.func.count()).select_from(posts)
+            .where(posts.c.user_id == user_id)
+            .scalar_subquery().label('your_posts')
+    )
+
+def stats_row_to_dict(row):
+    return {
+        'total_users': row.total_users,
+        'total_posts': row.total_posts,
+        'your_posts': row.your_posts
+    }
+
+def merge_stats(rows):
+    """
+    Сумма статистики по шардам
+    """
+    return {
+        'total_users': sum(row.total_users for row in rows),
+        'total_posts': sum(row.total_posts for row in rows),
+        'your_posts': sum(row.your_posts for row in rows)
+    }
+
+def dashboard_stats(db, user_id):
+    return merge_stats(shards.execute(db, dashboard_stats_query(db, user_id)))
+
+def recent_posts_query(db, limit=5):
+    """
+    Последние опубликованные посты (лента)
+    """
+    posts = _tables(db)['posts']
+    return select_posts(db)\
+        .where(posts.c.is_published == sa.true())\
+        .order_by(posts.c.created_at.desc())\
+        .limit(limit)
+
+def merge_recent_posts(rows, limit=5):
+    return [post_row_to_dict(row) for row in merge_sorted(rows, lambda row: row.created_at, limit, reverse=True)]
+
+def recent_posts(db, limit=5):
+    return merge_recent_posts(shards.execute(db, recent_posts_query(db, limit)), limit)
+
+def posts_page(db, viewer_id, after=None, limit=20, author_id=None, published=True):
+    """
+    Страница постов по убыванию (created_at, id) без OFFSET.
+    published: True / False / None (все); неопубликованные видит только автор.
+    Возвращает (посты, курсор следующей страницы или None)
+    """
+    posts = _tables(db)['posts']
+
+    # Каждая ветка - отдельный диапазон индекса со своим ORDER BY / LIMIT:
+    # опубликованные (ix_posts_published_created или ix_posts_user_published_created)
+    # и свои неопубликованные (ix_posts_user_published_created). OR двух условий
+    # в одном запросе не ложится на индекс и сортирует всю выборку.
+    branches = []
+    if published is not False:
+        branches.append((posts.c.is_published == sa.true(), author_id))
+    if published is not True and author_id in (None, viewer_id):
+        branches.append((posts.c.is_published == sa.false(), viewer_id))
+    if not branches:
+        return [], None
+
+    pages = []
+    for condition, user_id in branches:
+        query = select_posts(db).where(condition)
+        if user_id is not None:
+            query = query.where(posts.c.user_id == user_id)
+        if after is not None:
+            created_at, post_id = after
+            query = query.where(
+                sa.tuple_(posts.c.created_at, posts.c.id) < sa.tuple_(created_at, post_id)
+            )
+        # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+        pages.append(query.order_by(posts.c.created_at.desc(), posts.c.id.desc()).limit(limit + 1))
+
+    if len(pages) > 1:
+        # SQLite не допускает ORDER BY / LIMIT у частей UNION - только в подзапросах
+        query = sa.union_all(*(sa.select(query.subquery()) for query in pages))
+    else:
+        query = pages[0]
+
+    rows = merge_sorted(
+        shards.execute(db, query, user_id=author_id),
+        lambda row: (row.created_at, row.id),
+        limit + 1,
+        reverse=True
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return [post_row_to_dict(row) for row in rows], next_cursor
+
+def post_by_id_query(db, post_id, viewer_id):
+    """
+    Пост по id из горячей таблицы или из архива: два поиска по первичному ключу
+    в одном запросе. Неопубликованный пост видит только автор.
+    """
+    users = _tables(db)['users']
+    lookups = []
+    for table in (_tables(db)['posts'], _tables(db)['posts_archive']):
+        lookups.append(
+            sa.select(
+                table.c.id,
+                table.c.title,
+                table.c.content,
+                table.c.user_id,
+                users.c.username.label('author_username'),
+                table.c.created_at,
+                table.c.updated_at,
+                table.c.is_published
+            ).select_from(
+                table.outerjoin(users, users.c.id == table.c.user_id)
+            ).where(
+                table.c.id == post_id,
+                sa.or_(table.c.is_published == sa.true(), table.c.user_id == viewer_id)
+            )
+        )
+    return sa.union_all(*lookups).limit(1)
+
+def post_by_id(db, post_id, viewer_id):
+    rows = shards.execute(db, post_by_id_query(db, post_id, viewer_id))
+    return post_row_to_dict(rows[0]) if rows else None
+
+def active_users_query(db):
+    users = _tables(db)['users']
+    return sa.select(
+        users.c.id, users.c.username, users.c.email, users.c.created_at
+    ).where(users.c.is_active == sa.true())
+
+def user_row_to_dict(row):
+    return {
+        'id': row.id,
+        'username': row.username,
+        'email': row.email,
+        'created_at': row.created_at.isoformat()
+    }
+
+def active_users(db):
+    return [user_row_to_dict(row) for row in shards.execute(db, active_users_query(db))]
+
+def current_user_query(db, user_id):
+    """
+    Пользователь + профиль (outer join) для /auth/me
+    """
+    users = _tables(db)['users']
+    profiles = _tables(db)['user_profiles']
+    return sa.select(
+        users.c.id,
+        users.c.username,
+        users.c.email,
+        users.c.created_at,
+        users.c.is_active,
+        profiles.c.id.label('profile_id'),
+        profiles.c.first_name,
+        profiles.c.last_name,
+        profiles.c.bio,
+        profiles.c.avatar_url,
+        profiles.c.updated_at.label('profile_updated_at')
+    ).select_from(
+        users.outerjoin(profiles, profiles.c.user_id == users.c.id)
+    ).where(users.c.id == user_id).limit(1)
+
+def current_user_row_to_dict(row):
+    """
+    Строка current_user_query -> User.to_dict() + профиль (если есть)
+    """
+    if row is None:
+        return None
+
+    data = {
+        'id': row.id,
+        'username': row.username,
+        'email': row.email,
+        'created_at': row.created_at.isoformat(),
+        'is_active': row.is_active
+    }
+
+    if row.profile_id is not None:
+        data['profile'] = {
+            'id': row.profile_id,
+            'user_id': row.id,
+            'first_name': row.first_name,
+            'last_name': row.last_name,
+            'bio': row.bio,
+            'avatar_url': row.avatar_url,
+            'updated_at': row.profile_updated_at.isoformat()
+        }
+
+    return data
+
+def current_user(db, user_id):
+    rows = shards.execute(db, current_user_query(db, user_id), user_id=user_id)
+    return current_user_row_to_dict(rows[0] if rows else None)
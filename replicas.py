@@ -0,0 +1,137 @@
+import random
+import time
+from threading import Lock
+
+import sqlalchemy as sa
+from flask import current_app, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+class _StickyWrites:
+    """
+    Запоминает клиентов, недавно писавших в основную БД,
+    чтобы их чтения какое-то время тоже шли в основную БД (read-your-writes)
+    """
+
+    def __init__(self):
+        self._until = {}
+        self._lock = Lock()
+
+    def mark(self, key, seconds):
+        now = time.monotonic()
+        with self._lock:
+            self._until[key] = now + seconds
+            # Чистим просроченные записи, чтобы словарь не рос бесконечно
+            if len(self._until) > 10000:
+                self._until = {k: v for k, v in self._until.items() if v > now}
+
+    def is_sticky(self, key):
+        with self._lock:
+            until = self._until.get(key)
+        return until is not None and until > time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._until.clear()
+
+sticky_writes = _StickyWrites()
+
+def _client_key():
+    """
+    Ключ клиента для закрепления за основной БД: JWT identity или IP-адрес
+    """
+    if not has_request_context():
+        return None
+
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        identity = None
+
+    if identity:
+        return f'user:{identity}'
+    return f'addr:{request.remote_addr}'
+
+def _is_write(clause):
+    return isinstance(clause, sa.sql.dml.UpdateBase)
+
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет чтения на реплики, а записи - на основную БД.
+    После записи сессия (и клиент на READ_YOUR_WRITES_SECONDS) читает из основной БД.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._wrote = False
+        self._replica = None
+        self._shard = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        engine = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        engines = self._db.engines
+
+        # Модели с явным __bind_key__ не маршрутизируем
+        if engine is not engines.get(None):
+            return engine
+
+        # Данные пользователя в шарде (sharding.py): и чтения, и записи
+        if self._shard is not None:
+            return engines[self._shard]
+
+        if self._flushing or _is_write(clause):
+            self._mark_write()
+            return engine
+
+        if self._wrote or self._client_is_sticky():
+            return engine
+
+        return self._pick_replica(engines) or engine
+
+    def use_primary(self):
+        """
+        Закрепляет сессию за основной БД (миграции, наполнение данными)
+        """
+        self._wrote = True
+
+    def pinned_to_primary(self):
+        """
+        Реплики есть, но чтения сессии идут в основную БД (после своей записи).
+        Такие чтения нельзя обслуживать из общего кэша: его могли заполнить
+        чтением с отстающей реплики.
+        """
+        has_replicas = any(key and key.startswith(REPLICA_BIND_PREFIX) for key in self._db.engines)
+        return has_replicas and (self._wrote or self._client_is_sticky())
+
+    def use_shard(self, key):
+        """
+        Направляет сессию в шард key (bind shard_N) вместо основной БД
+        """
+        self._shard = key
+
+    def _pick_replica(self, engines):
+        if self._replica is None:
+            replicas = [
+                engine for key, engine in engines.items()
+                if key and key.startswith(REPLICA_BIND_PREFIX)
+            ]
+            if not replicas:
+                return None
+            # Одна реплика на всю сессию, чтобы чтения внутри запроса были согласованы
+            self._replica = random.choice(replicas)
+        return self._replica
+
+    def _mark_write(self):
+        self._wrote = True
+        key = _client_key()
+        if key is not None:
+            sticky_writes.mark(key, current_app.config.get('READ_YOUR_WRITES_SECONDS', 5))
+
+    def _client_is_sticky(self):
+        key = _client_key()
+        return key is not None and sticky_writes.is_sticky(key)
@@ -0,0 +1,102 @@
+import logging
+
+from sqlalchemy.schema import CreateTable
+
+logger = logging.getLogger(__name__)
+
+# SQLite проверяет внешние ключи (и выполняет ON DELETE CASCADE) только
+# при PRAGMA foreign_keys=ON, причем отдельно для каждого соединения.
+# А изменить ограничение существующей таблицы нельзя - только пересоздать ее.
+
+def sqlite_foreign_keys(dbapi_connection, connection_record):
+    """
+    Слушатель Engine 'connect': event.listen(Engine, 'connect', sqlite_foreign_keys)
+    """
+    if 'sqlite' not in type(dbapi_connection).__module__:
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+def _foreign_keys_outdated(connection, table):
+    """
+    True, если ON DELETE у внешних ключей таблицы в БД отличается от модели
+    """
+    existing = {
+        row[3]: row[6].upper()
+        for row in connection.execute(f'PRAGMA foreign_key_list("{table.name}")')  # nosec
+    }
+    for fk in table.foreign_keys:
+        expected = (fk.ondelete or 'NO ACTION').upper()
+        if existing.get(fk.parent.name, expected) != expected:
+            return True
+    return False
+
+def _rebuild_table(connection, table, dialect):
+    """
+    Пересоздание таблицы по модели с сохранением данных, индексов и триггеров
+    (https://www.sqlite.org/lang_altertable.html#otheralter)
+    """
+    name = table.name
+    old_name = f'_{name}_old'
+    extras = connection.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (name,)
+    ).fetchall()
+    columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{name}")')]  # nosec
+    common = ', '.join(f'"{column.name}"' for column in table.columns if column.name in columns)
+
+    # Индексы и триггеры переезжают вместе с переименованной таблицей - удаляем их заранее
+    for kind, extra_name, _ in extras:
+        connection.execute(f'DROP {kind.upper()} "{extra_name}"')
+    connection.execute(f'ALTER TABLE "{name}" RENAME TO "{old_name}"')
+    connection.execute(str(CreateTable(table).compile(dialect=dialect)))
+    connection.execute(f'INSERT INTO "{name}" ({common}) SELECT {common} FROM "{old_name}"')  # nosec
+    connection.execute(f'DROP TABLE "{old_name}"')
+    for _, _, sql in extras:
+        connection.execute(sql)
+
+    orphans = connection.execute(f'PRAGMA foreign_key_check("{name}")').fetchall()  # nosec
+    if orphans:
+        raise RuntimeError(f'{len(orphans)} rows in {name} reference missing rows, fix them before migrating')
+
+def ensure_foreign_keys(db, table_names):
+    """
+    Приводит ON DELETE внешних ключей существующих таблиц SQLite к модели.
+    create_all этого не делает: он не трогает уже созданные таблицы.
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return []
+
+    raw = engine.raw_connection()
+    try:
+        connection = raw.driver_connection
+        connection.commit()
+        outdated = [
+            db.metadata.tables[name] for name in table_names
+            if name in db.metadata.tables and _foreign_keys_outdated(connection, db.metadata.tables[name])
+        ]
+        if not outdated:
+            return []
+
+        # Внутри транзакции PRAGMA foreign_keys не меняется, поэтому выключаем до BEGIN
+        connection.execute('PRAGMA foreign_keys=OFF')
+        try:
+            connection.execute('BEGIN')
+            try:
+                for table in outdated:
+                    _rebuild_table(connection, table, engine.dialect)
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+        finally:
+            connection.execute('PRAGMA foreign_keys=ON')
+    finally:
+        raw.close()
+
+    rebuilt = [table.name for table in outdated]
+    logger.info("Rebuilt tables with updated foreign keys: %s", ', '.join(rebuilt))
+    return rebuilt
@@ -0,0 +1,288 @@
+import heapq
+import logging
+import zlib
+
+import click
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Горизонтальный шардинг: пользователь и все его данные (посты, архив, профиль,
+# журнал синхронизации) живут в одной из N баз (bind'ы shard_0 ... shard_N-1). Новый
+# пользователь попадает в шард crc32(User.id) % N. Справочник user_directory
+# в основной БД (SQLALCHEMY_DATABASE_URI) хранит id, username, email и шард -
+# по нему login и регистрация находят нужную базу. Глобальные запросы
+# (лента, статистика, синхронизация) выполняются во всех шардах и сливаются.
+# Без DATABASE_SHARD_URLS шардинг выключен и все идет через основную БД.
+
+SHARD_BIND_PREFIX = 'shard_'
+
+# Таблицы, которые хранятся в шардах (в порядке копирования при переносе)
+SHARDED_TABLES = ('users', 'user_profiles', 'posts', 'posts_archive')
+
+class ShardRouter:
+    """
+    shards = ShardRouter(); shards.init_app(app)
+    """
+
+    def __init__(self):
+        self.keys = []
+
+    def init_app(self, app):
+        binds = app.config.get('SQLALCHEMY_BINDS') or {}
+        self.keys = sorted(
+            (key for key in binds if key.startswith(SHARD_BIND_PREFIX)),
+            key=lambda key: int(key[len(SHARD_BIND_PREFIX):])
+        )
+        app.extensions['shards'] = self
+
+    @property
+    def enabled(self):
+        return bool(self.keys)
+
+    def shard_for(self, user_id):
+        """
+        Шард для нового пользователя (и целевой шард при ребалансировке)
+        """
+        return self.keys[zlib.crc32(user_id.encode('utf-8')) % len(self.keys)]
+
+    def _directory(self, db):
+        return db.metadata.tables['user_directory']
+
+    def _directory_engine(self, db):
+        return db.engines[None]
+
+    def lookup(self, db, user_id=None, username=None, email=None):
+        """
+        Шард пользователя по справочнику или None (нет пользователя / шардинг выключен)
+        """
+        if not self.enabled:
+            return None
+        directory = self._directory(db)
+        if user_id is not None:
+            condition = directory.c.id == user_id
+        elif username is not None:
+            condition = directory.c.username == username
+        else:
+            condition = directory.c.email == email
+        with self._directory_engine(db).connect() as connection:
+            return connection.execute(sa.select(directory.c.shard).where(condition)).scalar()
+
+    def use_user_shard(self, db, user_id=None, username=None, email=None):
+        """
+        Направляет текущую сессию в шард пользователя. Без шардинга ничего не делает.
+        """
+        if not self.enabled:
+            return None
+        key = self.lookup(db, user_id=user_id, username=username, email=email)
+        if key is not None:
+            db.session().use_shard(key)
+        return key
+
+    def place_user(self, db, user_id, username, email):
+        """
+        Регистрирует нового пользователя в справочнике и направляет сессию в его шард.
+        Уникальность username/email проверяет справочник (IntegrityError при конфликте).
+        """
+        if not self.enabled:
+            return None
+        key = self.shard_for(user_id)
+        with self._directory_engine(db).begin() as connection:
+            connection.execute(self._directory(db).insert().values(
+                id=user_id, username=username, email=email, shard=key
+            ))
+        db.session().use_shard(key)
+        return key
+
+    def remove_users(self, db, user_ids):
+        if not self.enabled or not user_ids:
+            return
+        directory = self._directory(db)
+        with self._directory_engine(db).begin() as connection:
+            connection.execute(directory.delete().where(directory.c.id.in_(list(user_ids))))
+
+    def user_exists(self, db, username=None, email=None):
+        """
+        Занят ли username/email: по справочнику или по таблице users без шардинга
+        """
+        if self.enabled:
+            return self.lookup(db, username=username, email=email) is not None
+        users = db.metadata.tables['users']
+        condition = users.c.username == username if username is not None else users.c.email == email
+        return db.session.execute(sa.select(users.c.id).where(condition)).first() is not None
+
+    def execute(self, db, statement, user_id=None):
+        """
+        Строки запроса: из шарда пользователя (user_id) или из всех шардов подряд.
+        Сортировку и LIMIT результата из нескольких шардов применяет вызывающий.
+        """
+        if not self.enabled:
+            return db.session.execute(statement).all()
+        if user_id is not None:
+            key = self.lookup(db, user_id=user_id)
+            keys = [key] if key is not None else []
+        else:
+            keys = self.keys
+        rows = []
+        for key in keys:
+            rows.extend(db.session.execute(statement, bind_arguments={'bind': db.engines[key]}).all())
+        return rows
+
+    def stream(self, db, statement, key_column, page_size=1000):
+        """
+        Строки запроса страницами по page_size (keyset по key_column), шард за шардом.
+        Каждая страница читается отдельной короткой транзакцией: между страницами
+        блокировка чтения SQLite снимается и запись не ждет всей выгрузки.
+        Память не зависит от размера результата; порядок - по key_column внутри шарда.
+        """
+        binds = [db.engines[key] for key in self.keys] if self.enabled else [None]
+        for bind in binds:
+            options = {'bind_arguments': {'bind': bind}} if bind is not None else {}
+            last_key = None
+            while True:
+                page = statement.order_by(key_column).limit(page_size)
+                if last_key is not None:
+                    page = page.where(key_column > last_key)
+                rows = db.session.execute(page, **options).all()
+                # Конец транзакции чтения до отдачи строк клиенту
+                db.session.commit()
+                yield from rows
+                if len(rows) < page_size:
+                    break
+                last_key = rows[-1]._mapping[key_column]
+
+    def each(self, db):
+        """
+        Перебирает базы с данными пользователей, направляя в каждую сессию.
+        Между шардами сессия должна быть закоммичена.
+        """
+        if not self.enabled:
+            db.session().use_primary()
+            yield None
+            return
+        for key in self.keys:
+            db.session().use_shard(key)
+            yield key
+
+    def create_all(self, db):
+        """
+        Схема шардов: все таблицы, кроме справочника
+        """
+        tables = [table for name, table in db.metadata.tables.items() if name != 'user_directory']
+        for key in self.keys:
+            db.metadata.create_all(db.engines[key], tables=tables)
+
+    def _move_user(self, db, user_id, source, target):
+        tables = db.metadata.tables
+        source_engine = db.engines[source]
+        target_engine = db.engines[target]
+        change_log = tables['post_change_log']
+
+        def purge(connection):
+            # Удаление каскадом пишет в журнал синхронизации удаления - посты не удалены, а перенесены
+            post_ids = []
+            for name in ('posts', 'posts_archive'):
+                table = tables[name]
+                post_ids += connection.execute(sa.select(table.c.id).where(table.c.user_id == user_id)).scalars().all()
+            users = tables['users']
+            connection.execute(users.delete().where(users.c.id == user_id))
+            if post_ids:
+                connection.execute(change_log.delete().where(change_log.c.post_id.in_(post_ids)))
+
+        # Весь перенос - одна транзакция записи в шарде-источнике. Пустой UPDATE
+        # сразу берет блокировку записи SQLite: запись в этот шард ждет конца
+        # переноса, и в источнике не появится ничего, что не попало в копию.
+        # Запрос, который выбрал старый шард до смены справочника, после
+        # переноса получит ошибку (пользователя в шарде уже нет), а не потеряет
+        # данные молча.
+        users = tables['users']
+        with source_engine.begin() as source_connection:
+            source_connection.execute(
+                users.update().where(users.c.id == user_id).values(is_active=users.c.is_active)
+            )
+            # 1. Копия в целевой шард (остатки прерванного переноса удаляются).
+            # Таблицы без типов: значения копируются как есть, сжатое остается сжатым
+            with target_engine.begin() as target_connection:
+                purge(target_connection)
+                for name in SHARDED_TABLES:
+                    if name not in tables:
+                        continue
+                    raw = sa.table(name, *[sa.column(column.name) for column in tables[name].columns])
+                    owner = raw.c.id if name == 'users' else raw.c.user_id
+                    rows = source_connection.execute(sa.select(raw).where(owner == user_id)).mappings().all()
+                    if rows:
+                        target_connection.execute(raw.insert(), [dict(row) for row in rows])
+            # 2. Справочник указывает на новый шард
+            directory = self._directory(db)
+            with self._directory_engine(db).begin() as connection:
+                connection.execute(directory.update().where(directory.c.id == user_id).values(shard=target))
+            # 3. Удаление из старого шарда (коммит снимает блокировку)
+            purge(source_connection)
+
+    def rebalance(self, db, batch_size=500):
+        """
+        Переносит пользователей, чей шард не совпадает с crc32(id) % N
+        (после добавления шардов). Генератор: (просмотрено, перенесено).
+        """
+        directory = self._directory(db)
+        scanned = moved = 0
+        last_id = None
+        while True:
+            page = sa.select(directory.c.id, directory.c.shard).order_by(directory.c.id).limit(batch_size)
+            if last_id is not None:
+                page = page.where(directory.c.id > last_id)
+            with self._directory_engine(db).connect() as connection:
+                rows = connection.execute(page).all()
+            if not rows:
+                break
+            for user_id, shard in rows:
+                target = self.shard_for(user_id)
+                if shard != target:
+                    self._move_user(db, user_id, shard, target)
+                    moved += 1
+            last_id = rows[-1].id
+            scanned += len(rows)
+            yield scanned, moved
+
+    def stats(self, db):
+        directory = self._directory(db)
+        with self._directory_engine(db).connect() as connection:
+            return dict(connection.execute(
+                sa.select(directory.c.shard, sa.func.count()).group_by(directory.c.shard)
+            ).all())
+
+shards = ShardRouter()
+
+def merge_sorted(rows, key, limit, reverse=False):
+    """
+    Первые limit строк из результатов нескольких шардов по ключу сортировки
+    """
+    return (heapq.nlargest if reverse else heapq.nsmallest)(limit, rows, key=key)
+
+def init_sharding(app, db):
+    shards.init_app(app)
+
+    @app.cli.group('shards')
+    def shards_group():
+        """Horizontal sharding of users and posts."""
+
+    @shards_group.command('status')
+    def shards_status_command():
+        """Users per shard according to the directory."""
+        counts = shards.stats(db) if shards.enabled else {}
+        for key in shards.keys:
+            click.echo(f'{key}: {counts.get(key, 0)} users')
+        if not shards.enabled:
+            click.echo('Sharding is disabled (DATABASE_SHARD_URLS is empty)')
+
+    @shards_group.command('rebalance')
+    @click.option('--batch-size', type=click.IntRange(1, 10000), default=500)
+    def shards_rebalance_command(batch_size):
+        """Move users to crc32(id) % N shards after the shard list changed."""
+        if not shards.enabled:
+            raise click.UsageError('Sharding is disabled (DATABASE_SHARD_URLS is empty)')
+        moved = 0
+        for scanned, moved in shards.rebalance(db, batch_size):
+            click.echo(f'{scanned} users scanned, {moved} moved')
+        logger.info("Shard rebalance moved %s users", moved, extra={'event': 'shards_rebalanced', 'moved': moved})
+        click.echo(f'Done: {moved} users moved')
@@ -0,0 +1,138 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+# Логирование без блокировок на потоке запроса: обработчик только кладет запись
+# в ограниченную очередь, форматирование в JSON и вывод делает QueueListener
+# в отдельном потоке. При переполнении очереди записи отбрасываются.
+
+# Стандартные атрибуты LogRecord - все остальное считается структурными полями из extra
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key != 'sample_rate' and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """
+    Добавляет request_id текущего запроса (выполняется на потоке запроса)
+    """
+    def filter(self, record):
+        if has_request_context() and not hasattr(record, 'request_id'):
+            record.request_id = g.get('request_id')
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает запись с вероятностью extra={'sample_rate': ...}
+    """
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', 1.0)
+        return rate >= 1.0 or random.random() < rate  # nosec
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # В отличие от QueueHandler не форматируем сообщение здесь:
+        # getMessage() и JSON выполняются в потоке QueueListener
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener = None
+
+def configure_logging(app):
+    """
+    Корневой логгер -> ограниченная очередь -> QueueListener -> stdout (JSON)
+    """
+    global _listener
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, NonBlockingQueueHandler):
+            root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(RequestContextFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root.addHandler(queue_handler)
+    root.setLevel(app.config['LOG_LEVEL'])
+    return queue_handler
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+atexit.register(_stop_listener)
+
+def init_request_logging(app, logger):
+    """
+    request_id (из X-Request-ID или новый) и длительность каждого запроса.
+    Обычные запросы логируются с вероятностью LOG_REQUEST_SAMPLE_RATE,
+    ошибки и медленные запросы - всегда.
+    """
+    @app.before_request
+    def start_request_timer():
+        g.request_id = (request.headers.get('X-Request-ID') or uuid.uuid4().hex)[:64]
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        important = response.status_code >= 500 or duration_ms >= app.config['LOG_SLOW_REQUEST_MS']
+
+        logger.info(
+            "%s %s %s",
+            request.method, request.path, response.status_code,
+            extra={
+                'event': 'request',
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 2),
+                'sample_rate': 1.0 if important else app.config['LOG_REQUEST_SAMPLE_RATE']
+            }
+        )
+        response.headers['X-Request-ID'] = g.request_id
+        return response
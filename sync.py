@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from pagination import InvalidCursor, decode_token, encode_token
+from queries import post_columns, post_row_to_dict
+from sharding import shards
+
+# Инкрементальная синхронизация постов по журналу изменений post_change_log.
+# Триггеры на posts держат в журнале по одной строке на пост: при создании,
+# изменении (updated_at / is_published) и удалении строка пишется заново
+# и получает следующий seq (AUTOINCREMENT). Номер выдает сама БД внутри
+# транзакции записи, а SQLite выполняет записи по одной, поэтому порядок
+# номеров совпадает с порядком коммитов: запись, закоммиченная после выдачи
+# токена, всегда получает номер больше позиции в токене. Время из Python
+# (updated_at) для этого не годится - его берут до коммита.
+# Номера свои в каждой базе, поэтому токен хранит позицию для каждого шарда
+# (без шардинга - одну) и время выдачи. Удаленные посты (deleted_at) хранятся
+# SYNC_TOMBSTONE_RETENTION_DAYS дней.
+
+# Удаление и вставка вместо INSERT OR REPLACE: конфликт-политика внешнего
+# оператора переопределяет политику оператора внутри триггера
+_LOG_POST = """
+    DELETE FROM post_change_log WHERE post_id = {row}.id;
+    INSERT INTO post_change_log (post_id, user_id, deleted_at) VALUES ({row}.id, {row}.user_id, {deleted_at});
+"""
+
+# Триггеры пишут журнал при любом способе изменения: ORM, Core и ON DELETE CASCADE
+post_change_triggers = (
+    sa.DDL(f"""
+CREATE TRIGGER IF NOT EXISTS trg_posts_change_insert
+AFTER INSERT ON posts
+BEGIN{_LOG_POST.format(row='NEW', deleted_at='NULL')}END
+"""),
+    # compress-posts переписывает content без изменения updated_at - это не изменение поста
+    sa.DDL(f"""
+CREATE TRIGGER IF NOT EXISTS trg_posts_change_update
+AFTER UPDATE ON posts
+WHEN NEW.updated_at IS NOT OLD.updated_at OR NEW.is_published IS NOT OLD.is_published
+BEGIN{_LOG_POST.format(row='NEW', deleted_at='NULL')}END
+"""),
+    sa.DDL(f"""
+CREATE TRIGGER IF NOT EXISTS trg_posts_change_delete
+AFTER DELETE ON posts
+BEGIN{_LOG_POST.format(row='OLD', deleted_at="strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now') || '000'")}END
+""")
+)
+
+# Прежний триггер писал надгробия в post_tombstones, журнал его заменяет
+_drop_legacy_trigger = sa.DDL('DROP TRIGGER IF EXISTS trg_posts_tombstone')
+
+# Посты, созданные до появления журнала
+_backfill_log = sa.text("""
+INSERT INTO post_change_log (post_id, user_id)
+SELECT id, user_id FROM posts
+WHERE NOT EXISTS (SELECT 1 FROM post_change_log WHERE post_change_log.post_id = posts.id)
+ORDER BY updated_at, id
+""")
+
+class SyncTokenExpired(Exception):
+    pass
+
+def _database_keys():
+    # None - основная БД без шардинга
+    return list(shards.keys) if shards.enabled else [None]
+
+def _position_name(key):
+    return key or 'primary'
+
+def install_change_log(db):
+    """
+    Триггеры журнала во всех базах с постами и строки журнала для старых постов.
+    create_all не добавляет триггеры в уже существующие таблицы.
+    """
+    engines = [db.engines[None]] + [db.engines[key] for key in shards.keys]
+    for engine in engines:
+        with engine.begin() as connection:
+            connection.execute(_drop_legacy_trigger)
+            for trigger in post_change_triggers:
+                connection.execute(trigger)
+            connection.execute(_backfill_log)
+
+def encode_sync_token(positions):
+    return encode_token([positions, datetime.utcnow().isoformat()])
+
+def decode_sync_token(token):
+    """
+    Токен -> ({база: последний seq}, время выдачи токена)
+    """
+    values = decode_token(token)
+    # Токены по (updated_at, id) до появления журнала
+    if isinstance(values, list) and len(values) == 3:
+        raise SyncTokenExpired('Sync token format changed, full resync required')
+    try:
+        positions, issued_at = values
+        return (
+            {str(name): int(seq) for name, seq in positions.items()},
+            datetime.fromisoformat(issued_at)
+        )
+    except (ValueError, TypeError, AttributeError):
+        raise InvalidCursor('Invalid sync token')
+
+def post_changes(db, viewer_id, since=None, limit=100, retention_days=30):
+    """
+    Изменения постов после токена since (без токена - полная синхронизация).
+    posts - созданные/измененные видимые посты,
+    deleted - id удаленных постов и чужих снятых с публикации.
+    """
+    tables = db.metadata.tables
+    log = tables['post_change_log']
+    posts = tables['posts']
+    users = tables['users']
+
+    if since:
+        positions, issued_at = decode_sync_token(since)
+        # Удаленные старше срока хранения могли быть вычищены - нужна полная синхронизация
+        if issued_at < datetime.utcnow() - timedelta(days=retention_days):
+            raise SyncTokenExpired('Sync token expired, full resync required')
+    else:
+        positions = {}
+
+    query = sa.select(log.c.seq, log.c.post_id, log.c.deleted_at, *post_columns(db)).select_from(
+        log.outerjoin(posts, posts.c.id == log.c.post_id).outerjoin(users, users.c.id == posts.c.user_id)
+    )
+    if not since:
+        # Полная синхронизация: только видимые посты. Удаленные и чужие
+        # неопубликованные клиенту не нужны - он их не видел
+        query = query.where(
+            log.c.deleted_at.is_(None),
+            sa.or_(posts.c.is_published == sa.true(), posts.c.user_id == viewer_id)
+        )
+
+    result_posts = []
+    deleted = []
+    has_more = False
+    remaining = limit
+    # Базы читаются по очереди: позиция каждой сдвигается только на прочитанное.
+    # Когда лимит исчерпан, запрос с LIMIT 1 только проверяет, есть ли еще изменения
+    for key in _database_keys():
+        name = _position_name(key)
+        options = {'bind_arguments': {'bind': db.engines[key]}} if key is not None else {}
+        rows = db.session.execute(
+            query.where(log.c.seq > positions.get(name, 0)).order_by(log.c.seq).limit(remaining + 1),
+            **options
+        ).all()
+        if len(rows) > remaining:
+            has_more = True
+            rows = rows[:remaining]
+        for row in rows:
+            if row.deleted_at is not None:
+                deleted.append({'id': row.post_id, 'reason': 'deleted'})
+            elif row.is_published or row.user_id == viewer_id:
+                result_posts.append(post_row_to_dict(row))
+            else:
+                deleted.append({'id': row.post_id, 'reason': 'unpublished'})
+        if rows:
+            positions[name] = rows[-1].seq
+        remaining -= len(rows)
+
+    return {
+        'posts': result_posts,
+        'deleted': deleted,
+        'next_token': encode_sync_token(positions),
+        'has_more': has_more
+    }
+
+def prune_tombstones(db, retention_days=30):
+    """
+    Удаляет из журнала записи об удаленных постах старше срока хранения
+    """
+    log = db.metadata.tables['post_change_log']
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = 0
+    for _ in shards.each(db):
+        result = db.session.execute(log.delete().where(log.c.deleted_at < cutoff))
+        db.session.commit()
+        removed += result.rowcount
+    return removed
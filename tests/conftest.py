@@ -0,0 +1,285 @@
+"""
+Общие фикстуры pytest
+
+app.py настраивается при импорте, поэтому окружение задается до импорта:
+у каждого процесса (и каждого воркера pytest-xdist) своя рабочая БД, очередь
+задач и дешевый bcrypt. Схема и тестовые данные (init_db) создаются один раз
+за запуск в шаблонной БД, а перед каждым тестом шаблон копируется в рабочую
+БД через SQLite backup API - без пересоздания схемы и хэширования паролей.
+
+    python -m pytest tests/ -n auto
+"""
+
+import itertools
+import os
+import re
+import socketserver
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+import sqlalchemy as sa
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_workdir = tempfile.mkdtemp(prefix='app-tests-')
+_database_path = os.path.join(_workdir, 'app.db')
+
+os.environ.update({
+    'DATABASE_URL': f'sqlite:///{_database_path}',
+    'DATABASE_REPLICA_URLS': '',
+    'DATABASE_SHARD_URLS': '',
+    'JOBS_DATABASE': os.path.join(_workdir, 'jobs.db'),
+    'JOBS_EAGER': 'true',
+    'BCRYPT_LOG_ROUNDS': '4',
+    'CACHE_URL': 'memory://',
+    'BACKUP_DIR': os.path.join(_workdir, 'backups'),
+    'BACKUP_INTERVAL': '0',
+    'ARCHIVE_INTERVAL': '0',
+    'PROFILING_ENABLED': 'false'
+})
+
+from app import app as flask_app, db, init_db, jwt, post_events  # noqa: E402
+from backup import copy_database  # noqa: E402
+from cache import CacheError, cache  # noqa: E402
+from health import latency  # noqa: E402
+from jobs import jobs  # noqa: E402
+from replicas import sticky_writes  # noqa: E402
+
+flask_app.config['TESTING'] = True
+
+def _template_path(tmp_path_factory):
+    root = tmp_path_factory.getbasetemp()
+    # У воркеров xdist свой basetemp внутри общего каталога запуска
+    if os.environ.get('PYTEST_XDIST_WORKER'):
+        root = root.parent
+    return root / 'template.db'
+
+def _copy_sqlite(source_path, target_path):
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+@pytest.fixture(scope='session')
+def template_db(tmp_path_factory):
+    """
+    Путь к БД со схемой и тестовыми данными, одной на весь запуск
+    """
+    path = _template_path(tmp_path_factory)
+    if not path.exists():
+        # Воркеры могут собрать шаблон одновременно: каждый пишет в свой файл
+        # и атомарно переименовывает его, результат одинаковый
+        init_db()
+        worker_path = path.with_name(f'template-{os.environ.get("PYTEST_XDIST_WORKER", "main")}.db')
+        copy_database(_database_path, str(worker_path), pages_per_step=-1, step_sleep=0)
+        os.replace(worker_path, path)
+    return str(path)
+
+def _reset_state():
+    """
+    Состояние процесса, которое переживает тест: кэши, хаб SSE, очередь задач
+    """
+    cache.clear()
+    sticky_writes.clear()
+    post_events.clear()
+    jwt.token_cache.clear()
+    flask_app.extensions['readiness'].clear()
+    latency.clear()
+    jobs.clear()
+
+@pytest.fixture
+def app(template_db):
+    """
+    Приложение с чистой копией шаблонной БД и сброшенным состоянием процесса
+    """
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+    _copy_sqlite(template_db, _database_path)
+    _reset_state()
+    yield flask_app
+    _reset_state()
+
+@pytest.fixture
+def replicas(app, tmp_path):
+    """
+    Две реплики (bind'ы replica_0, replica_1) - копии рабочей БД на момент
+    вызова фикстуры. Дальнейшие записи в них не попадают: реплики "отстают".
+    Возвращает {bind: путь к файлу}.
+    """
+    paths = {}
+    with app.app_context():
+        for index in range(2):
+            key = f'replica_{index}'
+            paths[key] = str(tmp_path / f'{key}.db')
+            _copy_sqlite(_database_path, paths[key])
+            db.engines[key] = sa.create_engine(f'sqlite:///{paths[key]}')
+    yield paths
+    with app.app_context():
+        for key in paths:
+            db.engines.pop(key).dispose()
+
+class _RespStore:
+    """
+    Данные RESP-сервера: ключ -> (значение, срок по time.monotonic или None)
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.cursors = {}
+        self.cursor_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _alive(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self.data[key]
+            item = None
+        return item
+
+    def execute(self, command, args):
+        if command in ('PING', 'AUTH', 'SELECT'):
+            return 'OK'
+        if command == 'GET':
+            item = self._alive(args[0])
+            return None if item is None else item[0]
+        if command == 'MGET':
+            return [None if (item := self._alive(key)) is None else item[0] for key in args]
+        if command == 'SET':
+            key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+            if 'NX' in options and self._alive(key) is not None:
+                return None
+            expires = None
+            if 'PX' in options:
+                expires = time.monotonic() + int(options[options.index('PX') + 1]) / 1000
+            self.data[key] = (value, expires)
+            return 'OK'
+        if command == 'DEL':
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if command == 'FLUSHDB':
+            self.data.clear()
+            return 'OK'
+        if command == 'SCAN':
+            # Курсор - номер снимка ключей: удаление между вызовами SCAN
+            # не сдвигает обход, как и в Redis
+            options = [arg.upper() for arg in args[1:]]
+            pattern = args[1:][options.index('MATCH') + 1] if 'MATCH' in options else '*'
+            count = int(args[1:][options.index('COUNT') + 1]) if 'COUNT' in options else 10
+            remaining = sorted(self.data) if args[0] == '0' else self.cursors.pop(args[0])
+            page, rest = remaining[:count], remaining[count:]
+            cursor = '0'
+            if rest:
+                cursor = str(next(self.cursor_ids))
+                self.cursors[cursor] = rest
+            return [cursor, [key for key in page if _glob_match(pattern, key)]]
+        return CacheError(f"ERR unknown command '{command}'")
+
+def _glob_match(pattern, key):
+    """
+    Шаблон MATCH в стиле Redis: * и ?, обратный слэш экранирует символ
+    """
+    regex = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            regex.append(re.escape(char))
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '*':
+            regex.append('.*')
+        elif char == '?':
+            regex.append('.')
+        else:
+            regex.append(re.escape(char))
+    return re.fullmatch(''.join(regex), key) is not None
+
+def _resp_encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, CacheError):
+        return f'-{reply}\r\n'.encode()
+    if reply == 'OK':
+        return b'+OK\r\n'
+    if isinstance(reply, int):
+        return f':{reply}\r\n'.encode()
+    if isinstance(reply, list):
+        return f'*{len(reply)}\r\n'.encode() + b''.join(_resp_encode(item) for item in reply)
+    data = reply.encode('utf-8')
+    return f'${len(data)}\r\n'.encode() + data + b'\r\n'
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+        return args
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if not args:
+                return
+            with self.server.store.lock:
+                reply = self.server.store.execute(args[0].upper(), args[1:])
+            self.wfile.write(_resp_encode(reply))
+
+class _RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+@pytest.fixture
+def resp_server():
+    """
+    Минимальный сервер протокола Redis (RESP2) в потоке текущего процесса:
+    команды, которые использует RedisBackend. Возвращает redis:// URL,
+    данные сервера доступны как resp_server.store.
+    """
+    server = _RespServer(('127.0.0.1', 0), _RespHandler)
+    server.store = _RespStore()
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    server.url = f'redis://127.0.0.1:{server.server_address[1]}/0'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def runner(app):
+    return app.test_cli_runner()
+
+@pytest.fixture
+def login(client):
+    """
+    login(username, password) -> заголовки с access-токеном
+    """
+    def login(username='testuser', password='test123'):
+        response = client.post('/auth/login', json={'username': username, 'password': password})
+        assert response.status_code == 200, response.get_json()
+        return {'Authorization': f"Bearer {response.get_json()['data']['access_token']}"}
+
+    return login
+
+@pytest.fixture
+def auth_headers(login):
+    return login()
+
+@pytest.fixture
+def admin_headers(login):
+    return login('admin', 'admin123')
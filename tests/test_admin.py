@@ -0,0 +1,34 @@
+"""
+Доступ к /admin/*: admin_required проверяет пользователя в БД, а не только токен
+"""
+
+import sqlalchemy as sa
+
+from app import User, db
+
+def test_admin_allowed(client, admin_headers):
+    assert client.get('/admin/backups', headers=admin_headers).status_code == 200
+
+def test_non_admin_forbidden(client, auth_headers):
+    assert client.get('/admin/backups', headers=auth_headers).status_code == 403
+
+def test_requires_token(client):
+    assert client.get('/admin/backups').status_code == 401
+
+def test_deactivated_admin_rejected(app, client, admin_headers):
+    with app.app_context():
+        db.session.execute(sa.update(User).where(User.username == 'admin').values(is_active=False))
+        db.session.commit()
+
+    response = client.get('/admin/backups', headers=admin_headers)
+    assert response.status_code == 401
+    assert response.get_json()['message'] == 'Account is deactivated'
+
+def test_deleted_admin_rejected(app, client, admin_headers):
+    with app.app_context():
+        db.session.execute(sa.delete(User).where(User.username == 'admin'))
+        db.session.commit()
+
+    response = client.get('/admin/backups', headers=admin_headers)
+    assert response.status_code == 401
+    assert response.get_json()['message'] == 'User not found'
@@ -0,0 +1,63 @@
+"""
+ASGI-режим (asgi.py): асинхронные /auth/* поверх той же схемы, что создает init_db
+"""
+
+import pytest
+from starlette.testclient import TestClient
+
+import asgi
+from jobs import jobs
+
+@pytest.fixture(scope='module')
+def asgi_client():
+    # Один event loop на модуль: пул aiosqlite привязан к циклу, где открыты соединения
+    with TestClient(asgi.application) as client:
+        yield client
+
+def test_register_login_me(app, asgi_client):
+    response = asgi_client.post('/auth/register', json={
+        'username': 'newuser', 'email': 'newuser@example.com', 'password': 'secret1'
+    })
+    assert response.status_code == 201, response.json()
+    assert response.json()['data']['user']['username'] == 'newuser'
+
+    response = asgi_client.post('/auth/login', json={'username': 'newuser', 'password': 'secret1'})
+    assert response.status_code == 200, response.json()
+    headers = {'Authorization': f"Bearer {response.json()['data']['access_token']}"}
+
+    response = asgi_client.get('/auth/me', headers=headers)
+    assert response.status_code == 200, response.json()
+    data = response.json()['data']
+    assert data['username'] == 'newuser'
+    assert data['profile']['user_id'] == data['id']
+
+def test_register_duplicate_username(app, asgi_client):
+    response = asgi_client.post('/auth/register', json={
+        'username': 'testuser', 'email': 'other@example.com', 'password': 'secret1'
+    })
+    assert response.status_code == 409
+
+def test_me_for_seed_user(app, asgi_client, auth_headers):
+    response = asgi_client.get('/auth/me', headers=auth_headers)
+    assert response.status_code == 200, response.json()
+    assert response.json()['data']['username'] == 'testuser'
+
+def test_profile_created_by_background_job(app, asgi_client, monkeypatch):
+    # Очередь в файле без воркеров: задачу выполняет тест
+    monkeypatch.setattr(jobs, 'eager', False)
+    monkeypatch.setattr(jobs, 'workers', 0)
+
+    response = asgi_client.post('/auth/register', json={
+        'username': 'queued', 'email': 'queued@example.com', 'password': 'secret1'
+    })
+    assert response.status_code == 201, response.json()
+    response = asgi_client.post('/auth/login', json={'username': 'queued', 'password': 'secret1'})
+    headers = {'Authorization': f"Bearer {response.json()['data']['access_token']}"}
+
+    assert 'profile' not in asgi_client.get('/auth/me', headers=headers).json()['data']
+    assert jobs.stats() == {'queued': 1}
+
+    assert jobs.run_next() is True
+    assert jobs.stats() == {}
+    data = asgi_client.get('/auth/me', headers=headers).json()['data']
+    assert data['profile']['user_id'] == data['id']
@@ -0,0 +1,78 @@
+"""
+POST /api/batch (batch.py): подзапросы через обработчики маршрутов, ошибки
+подзапросов и ограничения на сам пакет
+"""
+
+def _batch(client, headers, requests, **options):
+    return client.post('/api/batch', headers=headers, json=dict(options, requests=requests))
+
+def test_sequential_write_then_read(client, auth_headers):
+    response = _batch(client, auth_headers, [
+        {'method': 'POST', 'path': '/api/posts', 'body': {'title': 'from batch', 'content': 'text'}},
+        {'method': 'GET', 'path': '/api/posts?limit=1'}
+    ])
+    assert response.status_code == 200, response.get_json()
+    created, listed = response.get_json()['data']
+    assert created['status'] == 201
+    assert listed['status'] == 200
+    assert listed['body']['data']['posts'][0]['title'] == 'from batch'
+
+def test_parallel_reads_keep_order(client, auth_headers):
+    paths = ['/api/data', '/api/posts?limit=1', '/api/data']
+    response = _batch(client, auth_headers, [{'method': 'GET', 'path': path} for path in paths], parallel=True)
+    assert response.status_code == 200
+    results = response.get_json()['data']
+    assert [result['status'] for result in results] == [200, 200, 200]
+    assert 'posts' in results[1]['body']['data']
+
+def test_sub_request_not_found(client, auth_headers):
+    response = _batch(client, auth_headers, [
+        {'method': 'GET', 'path': '/api/missing'},
+        {'method': 'GET', 'path': '/api/posts/missing'}
+    ])
+    assert response.status_code == 200
+    missing_route, missing_post = response.get_json()['data']
+    # Обработчик 404 приложения и 404 самого маршрута
+    assert missing_route == {'status': 404, 'body': {'success': False, 'message': 'Endpoint not found'}}
+    assert missing_post['status'] == 404
+    assert missing_post['body']['success'] is False
+
+def test_sub_request_method_not_allowed(client, auth_headers):
+    # Для 405 обработчика нет: ответ строится из самого исключения, а не как потоковый
+    response = _batch(client, auth_headers, [
+        {'method': 'DELETE', 'path': '/api/data'},
+        {'method': 'GET', 'path': '/api/data'}
+    ])
+    assert response.status_code == 200
+    not_allowed, ok = response.get_json()['data']
+    assert not_allowed['status'] == 405
+    assert not_allowed['body']['success'] is False
+    assert 'not allowed' in not_allowed['body']['message']
+    assert ok['status'] == 200
+
+def test_sub_request_without_token(client, auth_headers):
+    response = client.post('/api/batch', json={'requests': [{'path': '/api/data'}]})
+    assert response.status_code == 401
+
+def test_size_limit(app, client, auth_headers):
+    limit = app.config['BATCH_MAX_REQUESTS']
+
+    response = _batch(client, auth_headers, [{'path': '/api/data'}] * limit)
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == limit
+
+    response = _batch(client, auth_headers, [{'path': '/api/data'}] * (limit + 1))
+    assert response.status_code == 400
+    assert response.get_json()['message'] == f'Too many requests in batch (max {limit})'
+
+def test_invalid_batches(client, auth_headers):
+    assert _batch(client, auth_headers, []).status_code == 400
+    assert _batch(client, auth_headers, [{'method': 'TRACE', 'path': '/api/data'}]).status_code == 400
+    assert _batch(client, auth_headers, [{'path': 'api/data'}]).status_code == 400
+
+def test_excluded_endpoints(client, auth_headers):
+    for path in ('/api/posts/stream', '/api/batch'):
+        method = 'POST' if path == '/api/batch' else 'GET'
+        response = _batch(client, auth_headers, [{'method': method, 'path': path}])
+        assert response.status_code == 400
+        assert 'not allowed in batch' in response.get_json()['message']
@@ -0,0 +1,121 @@
+"""
+Кэш (cache.py) на всех бэкендах: memory://, sqlite:/// и redis:// (сервер
+протокола Redis из фикстуры resp_server)
+"""
+
+import time
+
+import pytest
+from flask import Flask
+
+from cache import Cache
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def cache_url(request, tmp_path):
+    if request.param == 'memory':
+        return 'memory://'
+    if request.param == 'sqlite':
+        return f'sqlite:///{tmp_path / "cache.db"}'
+    return request.getfixturevalue('resp_server').url
+
+@pytest.fixture
+def make_cache(cache_url):
+    """
+    make_cache(prefix) -> Cache на общем бэкенде cache_url
+    """
+    def make_cache(prefix='test:'):
+        app = Flask(__name__)
+        app.config.update(
+            CACHE_ENABLED=True,
+            CACHE_URL=cache_url,
+            CACHE_KEY_PREFIX=prefix,
+            CACHE_DEFAULT_TTL=60,
+            CACHE_LOCK_TTL=1,
+            CACHE_MAX_ENTRIES=1000
+        )
+        return Cache(app)
+
+    return make_cache
+
+@pytest.fixture
+def cache(make_cache):
+    return make_cache()
+
+def test_get_and_set(cache):
+    assert cache.get('missing') is None
+    assert cache.get('missing', 'default') == 'default'
+
+    cache.set('key', {'answer': 42})
+    assert cache.get('key') == {'answer': 42}
+
+    cache.delete('key')
+    assert cache.get('key') is None
+
+def test_ttl(cache):
+    cache.set('short', 'value', ttl=0.05)
+    cache.set('long', 'value', ttl=60)
+    assert cache.get('short') == 'value'
+
+    time.sleep(0.1)
+    assert cache.get('short') is None
+    assert cache.get('long') == 'value'
+
+def test_invalidate_tags(cache):
+    cache.set('posts', 'posts', tags=['posts'])
+    cache.set('users', 'users', tags=['users'])
+    cache.set('both', 'both', tags=['posts', 'users'])
+
+    cache.invalidate_tags('posts')
+
+    assert cache.get('posts') is None
+    assert cache.get('both') is None
+    assert cache.get('users') == 'users'
+
+def test_get_or_set_computes_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'value'
+
+    assert cache.get_or_set('key', compute, tags=['posts']) == 'value'
+    assert cache.get_or_set('key', compute, tags=['posts']) == 'value'
+    assert len(calls) == 1
+
+def test_get_or_set_invalidated_during_compute(cache):
+    def compute():
+        # Запись в БД и инвалидация, пока значение еще вычисляется
+        cache.invalidate_tags('posts')
+        return 'stale'
+
+    assert cache.get_or_set('key', compute, tags=['posts']) == 'stale'
+    assert cache.get('key') is None
+
+def test_clear_removes_only_own_prefix(make_cache):
+    # * в префиксе не должен стать шаблоном, совпадающим с чужими ключами
+    own = make_cache('app*:')
+    other = make_cache('apple:')
+    other.backend = own.backend
+    for index in range(600):
+        own.set(f'key{index}', index)
+    other.set('key', 'value')
+
+    own.clear()
+
+    assert all(own.get(f'key{index}') is None for index in range(600))
+    assert other.get('key') == 'value'
+
+def test_invalidation_visible_to_other_workers(make_cache, cache_url):
+    # Два воркера - два экземпляра Cache над одним CACHE_URL
+    first, second = make_cache(), make_cache()
+    first.set('posts', 'old', tags=['posts'])
+    second.set('posts', 'old', tags=['posts'])
+
+    second.invalidate_tags('posts')
+
+    assert second.get('posts') is None
+    if cache_url == 'memory://':
+        # У каждого процесса своя память: первый воркер отдает устаревшее значение до TTL
+        assert first.get('posts') == 'old'
+    else:
+        assert first.get('posts') is None
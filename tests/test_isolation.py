@@ -0,0 +1,57 @@
+"""
+Изоляция тестов: каждый тест начинает с копии шаблонной БД и сброшенного
+состояния процесса. Параметризованные тесты выполняются дважды - второй
+прогон упадет, если первый оставил следы.
+"""
+
+import pytest
+
+from app import User, db, jwt, post_events
+from health import latency
+from jobs import jobs
+
+RUNS = [1, 2]
+
+@pytest.mark.parametrize('run', RUNS)
+def test_same_username_in_every_test(app, client, run):
+    with app.app_context():
+        assert User.query.filter_by(username='isolated').first() is None
+        user = User(username='isolated', email='isolated@example.com')
+        user.set_password('secret1')
+        db.session.add(user)
+        db.session.commit()
+
+    response = client.post('/auth/login', json={'username': 'isolated', 'password': 'secret1'})
+    assert response.status_code == 200
+
+@pytest.mark.parametrize('run', RUNS)
+def test_posts_do_not_leak_between_tests(app, client, auth_headers, run):
+    response = client.get('/api/posts', headers=auth_headers)
+    titles = [post['title'] for post in response.get_json()['data']['posts']]
+    assert 'isolated post' not in titles
+
+    response = client.post('/api/posts', headers=auth_headers, json={'title': 'isolated post', 'content': 'text'})
+    assert response.status_code == 201
+
+@pytest.mark.parametrize('run', RUNS)
+def test_process_state_is_reset(app, client, login, monkeypatch, run):
+    # Очередь в файле, а не немедленное выполнение
+    monkeypatch.setattr(jobs, 'eager', False)
+    assert post_events.subscriber_count == 0
+    assert jwt.token_cache.stats() == {'size': 0, 'hits': 0, 'misses': 0}
+    assert latency.snapshot()['count'] == 0
+    assert app.extensions['readiness']._result is None
+    assert jobs.stats() == {}
+
+    # Состояние, которое должна убрать фикстура
+    post_events.subscribe()
+    headers = login()
+    client.get('/api/data', headers=headers)
+    client.get('/api/data', headers=headers)
+    client.get('/ready')
+    assert jwt.token_cache.stats()['size'] == 1
+    assert latency.snapshot()['count'] > 0
+    assert app.extensions['readiness']._result is not None
+    # Задача на час вперед: воркер ее не выполнит до конца теста
+    jobs.enqueue('archive_posts', delay=3600)
+    assert jobs.stats() == {'queued': 1}
@@ -0,0 +1,160 @@
+"""
+Очередь фоновых задач (jobs.py) без воркеров: задачи выполняет сам тест через
+run_next(), поэтому порядок попыток детерминирован
+"""
+
+import sqlite3
+import time
+
+import pytest
+from flask import Flask, current_app
+
+from jobs import JobQueue
+
+@pytest.fixture
+def make_queue(tmp_path):
+    """
+    make_queue(**config) -> JobQueue над общим файлом очереди (как после перезапуска процесса)
+    """
+    path = str(tmp_path / 'jobs.db')
+
+    def make_queue(**config):
+        app = Flask(__name__)
+        app.config.update(
+            JOBS_DATABASE=path,
+            JOBS_EAGER=False,
+            JOBS_WORKERS=0,
+            JOBS_MAX_ATTEMPTS=3,
+            JOBS_RETRY_BACKOFF=60,
+            JOBS_LOCK_TIMEOUT=300,
+            JOBS_POLL_INTERVAL=0.01
+        )
+        app.config.update(config)
+        return JobQueue(app)
+
+    return make_queue
+
+def _job(queue, job_id):
+    connection = sqlite3.connect(queue.path)
+    connection.row_factory = sqlite3.Row
+    try:
+        return connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    finally:
+        connection.close()
+
+def test_enqueue_and_claim(make_queue):
+    queue = make_queue()
+    calls = []
+    queue.task('greet')(lambda who: calls.append(who))
+
+    job_id = queue.enqueue('greet', who='world')
+    assert queue.stats() == {'queued': 1}
+
+    assert queue.run_next() is True
+    assert calls == ['world']
+    assert _job(queue, job_id) is None
+    assert queue.run_next() is False
+
+def test_enqueue_unknown_task(make_queue):
+    with pytest.raises(ValueError):
+        make_queue().enqueue('missing')
+
+def test_delayed_job_waits(make_queue):
+    queue = make_queue()
+    queue.task('noop')(lambda: None)
+
+    queue.enqueue('noop', delay=3600)
+    assert queue.run_next() is False
+    assert queue.stats() == {'queued': 1}
+
+def test_retry_with_backoff(make_queue):
+    queue = make_queue()
+    attempts = []
+
+    @queue.task('flaky')
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('boom')
+
+    job_id = queue.enqueue('flaky')
+    before = time.time()
+    assert queue.run_next() is True
+
+    job = _job(queue, job_id)
+    assert job['status'] == 'queued'
+    assert job['attempts'] == 1
+    assert job['last_error'] == 'RuntimeError: boom'
+    assert job['locked_at'] is None
+    # Первая задержка - JOBS_RETRY_BACKOFF плюс не больше 20% разброса
+    assert before + 60 <= job['run_at'] <= time.time() + 60 * 1.2
+
+    # До run_at повтор не берется
+    assert queue.run_next() is False
+
+    connection = sqlite3.connect(queue.path)
+    connection.execute('UPDATE jobs SET run_at = 0 WHERE id = ?', (job_id,))
+    connection.commit()
+    connection.close()
+
+    assert queue.run_next() is True
+    assert len(attempts) == 2
+    assert _job(queue, job_id) is None
+
+def test_failed_after_max_attempts(make_queue):
+    queue = make_queue(JOBS_RETRY_BACKOFF=0)
+    attempts = []
+
+    @queue.task('broken')
+    def broken():
+        attempts.append(1)
+        raise RuntimeError('always')
+
+    job_id = queue.enqueue('broken')
+    while queue.run_next():
+        pass
+
+    assert len(attempts) == 3
+    job = _job(queue, job_id)
+    assert job['status'] == 'failed'
+    assert job['attempts'] == 3
+    assert job['last_error'] == 'RuntimeError: always'
+    assert queue.stats() == {'failed': 1}
+
+def test_max_attempts_per_job(make_queue):
+    queue = make_queue(JOBS_RETRY_BACKOFF=0)
+    queue.task('broken')(lambda: 1 / 0)
+
+    job_id = queue.enqueue('broken', max_attempts=1)
+    assert queue.run_next() is True
+    assert _job(queue, job_id)['status'] == 'failed'
+
+def test_claimed_job_resumes_after_restart(make_queue):
+    queue = make_queue(JOBS_LOCK_TIMEOUT=0.05)
+    queue.task('work')(lambda: None)
+    job_id = queue.enqueue('work')
+
+    # Воркер взял задачу и умер, не завершив ее
+    assert queue._claim()['id'] == job_id
+    assert _job(queue, job_id)['status'] == 'running'
+    assert queue.run_next() is False
+
+    restarted = make_queue(JOBS_LOCK_TIMEOUT=0.05)
+    calls = []
+    restarted.task('work')(lambda: calls.append(1))
+    # Пока блокировка свежая, задачу не берет никто
+    assert restarted.run_next() is False
+
+    time.sleep(0.1)
+    assert restarted.run_next() is True
+    assert calls == [1]
+    assert _job(restarted, job_id) is None
+
+def test_task_runs_in_app_context(make_queue):
+    queue = make_queue()
+    apps = []
+    queue.task('where')(lambda: apps.append(current_app._get_current_object()))
+
+    queue.enqueue('where')
+    queue.run_next()
+    assert apps == [queue.app]
@@ -0,0 +1,162 @@
+"""
+Постраничный список постов (GET /api/posts, GET /api/users/<id>/posts):
+keyset-пагинация по (created_at, id) и фильтр is_published
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app import Post, User, db
+
+# Позже демонстрационных постов из init_db: тестовые посты всегда в начале ленты
+START = datetime.utcnow() + timedelta(days=1)
+
+@pytest.fixture
+def add_posts(app):
+    """
+    add_posts(username, count, published, offset) -> id постов; created_at
+    идет по минутам от START + offset, чтобы порядок был детерминирован
+    """
+    def add_posts(username, count, published=True, offset=0):
+        with app.app_context():
+            user_id = db.session.execute(sa.select(User.id).where(User.username == username)).scalar()
+            posts = [
+                Post(
+                    title=f'{username} {"published" if published else "draft"} {offset + index}',
+                    content='text',
+                    user_id=user_id,
+                    is_published=published,
+                    created_at=START + timedelta(minutes=offset + index)
+                )
+                for index in range(count)
+            ]
+            db.session.add_all(posts)
+            db.session.commit()
+            return [post.id for post in posts]
+
+    return add_posts
+
+@pytest.fixture
+def user_ids(app):
+    with app.app_context():
+        return dict(db.session.execute(sa.select(User.username, User.id)).all())
+
+def _pages(client, headers, url, limit=3, **params):
+    """
+    Все страницы подряд: список заголовков по страницам
+    """
+    pages, cursor = [], None
+    while True:
+        query = dict(params, limit=limit)
+        if cursor:
+            query['cursor'] = cursor
+        response = client.get(url, headers=headers, query_string=query)
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()['data']
+        pages.append([post['title'] for post in data['posts']])
+        cursor = data['next_cursor']
+        if cursor is None:
+            return pages
+
+def _flat(pages):
+    return [title for page in pages for title in page]
+
+def _ids(app, titles):
+    with app.app_context():
+        by_title = dict(db.session.execute(sa.select(Post.title, Post.id)).all())
+    return [by_title[title] for title in titles]
+
+def test_pages_are_ordered_and_complete(client, auth_headers, add_posts):
+    add_posts('testuser', 7)
+
+    pages = _pages(client, auth_headers, '/api/posts')
+    titles = _flat(pages)
+
+    # 7 новых + 2 демонстрационных поста; страницы по 3, без повторов
+    assert [len(page) for page in pages] == [3, 3, 3]
+    assert len(set(titles)) == 9
+    assert titles[:7] == [f'testuser published {index}' for index in reversed(range(7))]
+
+def test_cursor_is_stable_across_inserts(client, auth_headers, add_posts):
+    add_posts('testuser', 6)
+
+    response = client.get('/api/posts', headers=auth_headers, query_string={'limit': 3})
+    first = response.get_json()['data']
+    assert [post['title'] for post in first['posts']] == [
+        'testuser published 5', 'testuser published 4', 'testuser published 3'
+    ]
+
+    # Новые посты выше курсора не сдвигают следующую страницу (в отличие от OFFSET)
+    add_posts('testuser', 3, offset=100)
+
+    response = client.get(
+        '/api/posts', headers=auth_headers, query_string={'limit': 3, 'cursor': first['next_cursor']}
+    )
+    assert [post['title'] for post in response.get_json()['data']['posts']] == [
+        'testuser published 2', 'testuser published 1', 'testuser published 0'
+    ]
+
+def test_same_created_at_is_ordered_by_id(app, client, auth_headers, add_posts):
+    ids = add_posts('testuser', 5)
+    with app.app_context():
+        db.session.execute(sa.update(Post).where(Post.id.in_(ids)).values(created_at=START))
+        db.session.commit()
+
+    pages = _pages(client, auth_headers, '/api/posts', limit=2)
+    titles = _flat(pages)
+    assert len(titles) == len(set(titles)) == 7
+    assert sorted(ids, reverse=True) == [
+        post_id for post_id in _ids(app, titles) if post_id in ids
+    ]
+
+def test_author_filter(client, auth_headers, add_posts, user_ids):
+    add_posts('testuser', 4)
+    add_posts('admin', 4, offset=10)
+    add_posts('admin', 2, published=False, offset=20)
+
+    titles = _flat(_pages(client, auth_headers, f"/api/users/{user_ids['admin']}/posts"))
+    assert titles[:4] == [f'admin published {index}' for index in (13, 12, 11, 10)]
+    assert len(titles) == 5
+    assert not any(title.startswith(('admin draft', 'testuser')) for title in titles)
+
+    # Черновики другого автора не видны и с is_published=all / false
+    titles = _flat(_pages(client, auth_headers, f"/api/users/{user_ids['admin']}/posts", is_published='all'))
+    assert len(titles) == 5
+    assert _flat(_pages(client, auth_headers, f"/api/users/{user_ids['admin']}/posts", is_published='false')) == []
+
+def test_unknown_author(client, auth_headers):
+    response = client.get('/api/users/missing/posts', headers=auth_headers)
+    assert response.status_code == 404
+
+def test_all_merges_published_and_own_drafts(client, auth_headers, login, add_posts, user_ids):
+    # Черновики и опубликованные вперемешку по времени
+    add_posts('testuser', 3, offset=0)
+    add_posts('testuser', 3, published=False, offset=3)
+    add_posts('admin', 3, offset=6)
+    add_posts('admin', 2, published=False, offset=9)
+
+    titles = _flat(_pages(client, auth_headers, '/api/posts', limit=2, is_published='all'))
+    expected = (
+        [f'admin published {index}' for index in (8, 7, 6)]
+        + [f'testuser draft {index}' for index in (5, 4, 3)]
+        + [f'testuser published {index}' for index in (2, 1, 0)]
+    )
+    assert titles[:9] == expected
+    assert len(titles) == 11
+    assert not any(title.startswith('admin draft') for title in titles)
+
+    # Своя лента автора с is_published=all - тоже с черновиками
+    titles = _flat(_pages(client, auth_headers, f"/api/users/{user_ids['testuser']}/posts", is_published='all'))
+    assert titles[:6] == [f'testuser draft {index}' for index in (5, 4, 3)] + [
+        f'testuser published {index}' for index in (2, 1, 0)
+    ]
+    assert len(titles) == 7
+
+    titles = _flat(_pages(client, login('admin', 'admin123'), '/api/posts', is_published='false'))
+    assert titles == ['admin draft 10', 'admin draft 9']
+
+def test_invalid_parameters(client, auth_headers):
+    assert client.get('/api/posts?is_published=maybe', headers=auth_headers).status_code == 400
+    assert client.get('/api/posts?cursor=garbage', headers=auth_headers).status_code == 400
@@ -0,0 +1,72 @@
+"""
+Маршрутизация чтений на реплики (replicas.py). Реплики из фикстуры replicas -
+копии рабочей БД на начало теста, поэтому записи теста в них не видны.
+"""
+
+import sqlite3
+
+import sqlalchemy as sa
+
+from app import Post, User, db
+
+def _database_file():
+    """
+    Файл базы, в которую сессия направила чтение
+    """
+    return db.session.execute(sa.text("SELECT file FROM pragma_database_list WHERE name = 'main'")).scalar()
+
+def _primary_file():
+    return db.engines[None].url.database
+
+def _titles(client, headers):
+    response = client.get('/api/posts', headers=headers)
+    assert response.status_code == 200
+    return [post['title'] for post in response.get_json()['data']['posts']]
+
+def test_reads_use_primary_without_replicas(app):
+    with app.app_context():
+        assert _database_file() == _primary_file()
+
+def test_reads_use_one_replica_per_session(app, replicas):
+    with app.app_context():
+        first = _database_file()
+        assert first in replicas.values()
+        assert all(_database_file() == first for _ in range(5))
+
+def test_writes_go_to_primary_and_pin_the_session(app, replicas):
+    with app.app_context():
+        user_id = db.session.execute(sa.select(User.id).where(User.username == 'testuser')).scalar()
+        db.session.add(Post(title='fresh', content='text', user_id=user_id))
+        db.session.commit()
+
+        # После записи сессия читает свои данные из основной БД
+        assert _database_file() == _primary_file()
+        assert db.session.execute(sa.select(Post.id).where(Post.title == 'fresh')).first() is not None
+
+    for path in replicas.values():
+        connection = sqlite3.connect(path)
+        try:
+            assert connection.execute("SELECT COUNT(*) FROM posts WHERE title = 'fresh'").fetchone()[0] == 0
+        finally:
+            connection.close()
+
+def test_client_reads_its_own_writes(client, login, replicas):
+    author = login()
+    other = login('admin', 'admin123')
+
+    response = client.post('/api/posts', headers=author, json={'title': 'fresh', 'content': 'text'})
+    assert response.status_code == 201
+
+    # Автор READ_YOUR_WRITES_SECONDS читает из основной БД, остальные - с отстающей реплики
+    assert 'fresh' in _titles(client, author)
+    assert 'fresh' not in _titles(client, other)
+
+def test_reads_return_to_replica_when_window_expires(app, client, login, replicas, monkeypatch):
+    monkeypatch.setitem(app.config, 'READ_YOUR_WRITES_SECONDS', 0)
+    author = login()
+
+    response = client.post('/api/posts', headers=author, json={'title': 'fresh', 'content': 'text'})
+    assert response.status_code == 201
+
+    # Окно закрепления истекло: автор снова читает с реплики и видит ее отставание
+    assert 'fresh' not in _titles(client, author)
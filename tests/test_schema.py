@@ -0,0 +1,66 @@
+"""
+Миграции схемы в init_db: пересоздание таблиц SQLite, созданных до
+ON DELETE CASCADE (schema.py), с сохранением данных и индексов
+"""
+
+import sqlite3
+
+import pytest
+
+from app import db, init_db
+
+LEGACY_PROFILES = '''
+CREATE TABLE user_profiles (
+    id VARCHAR(36) NOT NULL PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL REFERENCES users (id),
+    first_name VARCHAR(50),
+    last_name VARCHAR(50),
+    bio TEXT,
+    avatar_url VARCHAR(255),
+    updated_at DATETIME
+)
+'''
+
+@pytest.fixture
+def database(app):
+    with app.app_context():
+        path = db.engines[None].url.database
+        db.engine.dispose()
+    connection = sqlite3.connect(path)
+    yield connection
+    connection.close()
+
+def _on_delete(connection, table):
+    return {row[3]: row[6] for row in connection.execute(f'PRAGMA foreign_key_list("{table}")')}
+
+def _indexes(connection, table):
+    return {row[1] for row in connection.execute(f'PRAGMA index_list("{table}")')}
+
+def test_user_profiles_rebuilt_with_cascade(database):
+    user_id = database.execute("SELECT id FROM users WHERE username = 'testuser'").fetchone()[0]
+    database.executescript('DROP TABLE user_profiles;' + LEGACY_PROFILES)
+    database.execute(
+        "INSERT INTO user_profiles (id, user_id, first_name) VALUES ('p1', ?, 'Test')", (user_id,)
+    )
+    database.commit()
+    assert _on_delete(database, 'user_profiles') == {'user_id': 'NO ACTION'}
+
+    init_db()
+
+    assert _on_delete(database, 'user_profiles') == {'user_id': 'CASCADE'}
+    assert 'ix_user_profiles_user_id' in _indexes(database, 'user_profiles')
+    assert database.execute('SELECT id, user_id, first_name FROM user_profiles').fetchall() == [
+        ('p1', user_id, 'Test')
+    ]
+
+    # Профиль удаляет сама БД вместе с пользователем
+    database.execute('PRAGMA foreign_keys=ON')
+    database.execute('DELETE FROM users WHERE id = ?', (user_id,))
+    database.commit()
+    assert database.execute('SELECT COUNT(*) FROM user_profiles').fetchone()[0] == 0
+
+def test_init_db_is_idempotent(database):
+    before = database.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+    init_db()
+    assert database.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == before
+    assert _on_delete(database, 'user_profiles') == {'user_id': 'CASCADE'}
@@ -0,0 +1,228 @@
+"""
+Шардинг пользователей и постов (sharding.py) на нескольких файлах SQLite:
+размещение, слияние ленты из шардов и ребалансировка после добавления шарда
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app import ArchivedPost, Post, User, db
+from sharding import SHARDED_TABLES, ShardRouter, shards
+from sync import install_change_log, post_changes
+from user_profiles import create_user_profile
+
+START = datetime(2024, 1, 1)
+
+@pytest.fixture
+def add_shard(app, tmp_path, monkeypatch):
+    """
+    add_shard() -> ключ нового пустого шарда (bind shard_N). Первый вызов
+    включает шардинг; справочник user_directory остается в основной БД.
+    """
+    monkeypatch.setattr(shards, 'keys', [])
+    keys = []
+
+    def add_shard():
+        key = f'shard_{len(keys)}'
+        with app.app_context():
+            db.engines[key] = sa.create_engine(f'sqlite:///{tmp_path / key}.db')
+            keys.append(key)
+            shards.keys = list(keys)
+            shards.create_all(db)
+            install_change_log(db)
+        return key
+
+    yield add_shard
+    with app.app_context():
+        for key in keys:
+            db.engines.pop(key).dispose()
+
+@pytest.fixture
+def add_user(app):
+    """
+    add_user(index, posts, archived) -> id пользователя с профилем, постами
+    и архивными постами; id фиксированы, поэтому шарды детерминированы
+    """
+    def add_user(index, posts=2, archived=1):
+        user_id = f'user-{index:02d}'
+        username = f'sharded{index:02d}'
+        with app.app_context():
+            user = User(id=user_id, username=username, email=f'{username}@example.com')
+            user.set_password('secret1')
+            shards.place_user(db, user_id, user.username, user.email)
+            db.session.add(user)
+            # У ArchivedPost нет relationship к User: порядок вставки задаем сами
+            db.session.flush()
+            for number in range(posts):
+                db.session.add(Post(
+                    title=f'{username} post {number}',
+                    content='text',
+                    user_id=user_id,
+                    created_at=START + timedelta(minutes=index * 10 + number)
+                ))
+            for number in range(archived):
+                db.session.add(ArchivedPost(
+                    id=f'{user_id}-archived-{number}',
+                    title=f'{username} archived {number}',
+                    content='archived text',
+                    user_id=user_id,
+                    created_at=START - timedelta(days=400),
+                    is_published=True,
+                    archived_at=START
+                ))
+            db.session.commit()
+            assert create_user_profile(db, user_id)
+        return user_id
+
+    return add_user
+
+def _count(key, table, where=''):
+    with db.engines[key].connect() as connection:
+        return connection.execute(sa.text(f'SELECT COUNT(*) FROM {table} {where}')).scalar()  # nosec
+
+def _totals(app):
+    with app.app_context():
+        return {table: sum(_count(key, table) for key in shards.keys) for table in SHARDED_TABLES}
+
+def _owners(app, user_id):
+    """
+    Шарды, в которых есть строки пользователя
+    """
+    with app.app_context():
+        return [key for key in shards.keys if _count(key, 'users', f"WHERE id = '{user_id}'")]
+
+def _tombstones(app):
+    with app.app_context():
+        return sum(_count(key, 'post_change_log', 'WHERE deleted_at IS NOT NULL') for key in shards.keys)
+
+def _check_placement(app, user_ids):
+    with app.app_context():
+        for user_id in user_ids:
+            key = shards.shard_for(user_id)
+            assert shards.lookup(db, user_id=user_id) == key
+            for table, column in (('users', 'id'), ('user_profiles', 'user_id'),
+                                  ('posts', 'user_id'), ('posts_archive', 'user_id')):
+                where = f"WHERE {column} = '{user_id}'"
+                assert [shard for shard in shards.keys if _count(shard, table, where)] == [key], table
+
+def test_users_placed_by_hash(app, add_shard, add_user):
+    for _ in range(3):
+        add_shard()
+    user_ids = [add_user(index) for index in range(12)]
+
+    _check_placement(app, user_ids)
+    with app.app_context():
+        stats = shards.stats(db)
+        assert sum(stats.values()) == 12
+        # crc32 от фиксированных id раскладывает пользователей по всем шардам
+        assert set(stats) == set(shards.keys)
+        # Основная БД хранит только справочник
+        assert _count(None, 'users', "WHERE id LIKE 'user-%'") == 0
+
+def test_login_and_feed_merge_across_shards(app, client, login, add_shard, add_user):
+    for _ in range(3):
+        add_shard()
+    for index in range(9):
+        add_user(index, posts=3, archived=0)
+
+    headers = login('sharded04', 'secret1')
+    titles, cursor = [], None
+    while True:
+        query = {'limit': 4, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/posts', headers=headers, query_string=query)
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()['data']
+        titles += [post['title'] for post in data['posts']]
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+
+    # Одна лента по убыванию created_at из всех шардов, без повторов и пропусков
+    expected = [f'sharded{index:02d} post {number}' for index in range(9) for number in range(3)]
+    assert titles == list(reversed(expected))
+
+    response = client.get('/api/data', headers=headers)
+    assert response.status_code == 200
+
+def test_rebalance_after_adding_shard(app, runner, add_shard, add_user):
+    add_shard()
+    add_shard()
+    user_ids = [add_user(index) for index in range(12)]
+    before = _totals(app)
+
+    add_shard()
+    with app.app_context():
+        misplaced = [
+            user_id for user_id in user_ids
+            if shards.lookup(db, user_id=user_id) != shards.shard_for(user_id)
+        ]
+    assert misplaced
+
+    result = runner.invoke(args=['shards', 'rebalance', '--batch-size', '5'])
+    assert result.exit_code == 0, result.output
+    assert f'Done: {len(misplaced)} users moved' in result.output
+
+    _check_placement(app, user_ids)
+    assert _totals(app) == before
+    # Перенос - не удаление: клиентам синхронизации нечего удалять
+    assert _tombstones(app) == 0
+    with app.app_context():
+        changes = post_changes(db, viewer_id=user_ids[0], limit=1000)
+    assert changes['deleted'] == []
+    assert len(changes['posts']) == before['posts']
+
+    # Повторный запуск ничего не переносит
+    result = runner.invoke(args=['shards', 'rebalance'])
+    assert 'Done: 0 users moved' in result.output
+
+def test_interrupted_move_can_be_rerun(app, add_shard, add_user, monkeypatch):
+    add_shard()
+    add_shard()
+    user_ids = [add_user(index) for index in range(12)]
+    before = _totals(app)
+    add_shard()
+
+    # Процесс "умирает" после копии в целевой шард, до смены справочника
+    state = {'moving': False, 'failed': False}
+    move_user = ShardRouter._move_user
+    directory_engine = ShardRouter._directory_engine
+
+    def tracked_move(self, *args):
+        state['moving'] = True
+        try:
+            return move_user(self, *args)
+        finally:
+            state['moving'] = False
+
+    def failing_directory_engine(self, db):
+        if state['moving'] and not state['failed']:
+            state['failed'] = True
+            raise RuntimeError('worker killed')
+        return directory_engine(self, db)
+
+    monkeypatch.setattr(ShardRouter, '_move_user', tracked_move)
+    monkeypatch.setattr(ShardRouter, '_directory_engine', failing_directory_engine)
+
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            for _ in shards.rebalance(db, batch_size=5):
+                pass
+        interrupted = [
+            user_id for user_id in user_ids
+            if shards.lookup(db, user_id=user_id) != shards.shard_for(user_id)
+            and len(_owners(app, user_id)) == 2
+        ]
+    # Копия осталась в целевом шарде, источник и справочник не изменились
+    assert len(interrupted) == 1
+    assert _totals(app)['posts'] > before['posts']
+
+    with app.app_context():
+        for _ in shards.rebalance(db, batch_size=5):
+            pass
+
+    _check_placement(app, user_ids)
+    assert _owners(app, interrupted[0]) == [shards.shard_for(interrupted[0])]
+    assert _totals(app) == before
+    assert _tombstones(app) == 0
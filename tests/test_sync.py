@@ -0,0 +1,172 @@
+"""
+Инкрементальная синхронизация (sync.py): журнал post_change_log, токены
+и GET /api/posts/changes
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app import Post, PostChange, User, db
+from pagination import encode_token
+from sync import encode_sync_token, prune_tombstones
+
+@pytest.fixture
+def user_ids(app):
+    with app.app_context():
+        return dict(db.session.execute(sa.select(User.username, User.id)).all())
+
+@pytest.fixture
+def add_post(app, user_ids):
+    def add_post(username, title, published=True):
+        with app.app_context():
+            post = Post(title=title, content='text', user_id=user_ids[username], is_published=published)
+            db.session.add(post)
+            db.session.commit()
+            return post.id
+
+    return add_post
+
+def _log(app, post_id):
+    with app.app_context():
+        return db.session.execute(
+            sa.select(PostChange.seq, PostChange.deleted_at).where(PostChange.post_id == post_id)
+        ).first()
+
+def _changes(client, headers, since=None):
+    response = client.get('/api/posts/changes', headers=headers, query_string={'since': since} if since else {})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+def _titles(changes):
+    return sorted(post['title'] for post in changes['posts'])
+
+def test_triggers_keep_one_row_per_post(app, add_post):
+    post_id = add_post('testuser', 'logged')
+    created = _log(app, post_id)
+    assert created.deleted_at is None
+
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        post.title = 'edited'
+        db.session.commit()
+    edited = _log(app, post_id)
+    assert edited.seq > created.seq
+
+    # Перезапись content без updated_at (compress-posts) изменением не считается
+    with app.app_context():
+        db.session.execute(sa.text("UPDATE posts SET content = 'packed' WHERE id = :id"), {'id': post_id})
+        db.session.commit()
+    assert _log(app, post_id).seq == edited.seq
+
+    with app.app_context():
+        db.session.execute(sa.delete(Post).where(Post.id == post_id))
+        db.session.commit()
+    deleted = _log(app, post_id)
+    assert deleted.seq > edited.seq
+    assert deleted.deleted_at is not None
+
+    with app.app_context():
+        assert db.session.execute(
+            sa.select(sa.func.count()).select_from(PostChange).where(PostChange.post_id == post_id)
+        ).scalar() == 1
+
+def test_full_sync_returns_only_visible_posts(app, client, auth_headers, add_post):
+    add_post('testuser', 'own draft', published=False)
+    add_post('admin', 'foreign draft', published=False)
+    deleted_id = add_post('admin', 'deleted')
+    with app.app_context():
+        db.session.execute(sa.delete(Post).where(Post.id == deleted_id))
+        db.session.commit()
+
+    changes = _changes(client, auth_headers)
+    assert _titles(changes) == sorted([
+        'Добро пожаловать в наше приложение!', 'Второй демонстрационный пост', 'own draft'
+    ])
+    # Чужие черновики и удаленные посты клиент не видел - сообщать о них нечего
+    assert changes['deleted'] == []
+    assert changes['has_more'] is False
+
+def test_incremental_changes(app, client, auth_headers, add_post):
+    draft_id = add_post('admin', 'will be unpublished')
+    token = _changes(client, auth_headers)['next_token']
+    assert _changes(client, auth_headers, token)['posts'] == []
+
+    new_id = add_post('admin', 'new')
+    with app.app_context():
+        db.session.get(Post, draft_id).is_published = False
+        db.session.commit()
+
+    changes = _changes(client, auth_headers, token)
+    assert _titles(changes) == ['new']
+    assert changes['deleted'] == [{'id': draft_id, 'reason': 'unpublished'}]
+
+    token = changes['next_token']
+    with app.app_context():
+        db.session.execute(sa.delete(Post).where(Post.id == new_id))
+        db.session.commit()
+
+    changes = _changes(client, auth_headers, token)
+    assert changes['posts'] == []
+    assert changes['deleted'] == [{'id': new_id, 'reason': 'deleted'}]
+
+def test_pages_with_has_more(app, client, auth_headers, add_post, monkeypatch):
+    monkeypatch.setitem(app.config, 'SYNC_PAGE_SIZE', 2)
+    for index in range(3):
+        add_post('testuser', f'post {index}')
+
+    titles, token, pages = [], None, 0
+    while True:
+        changes = _changes(client, auth_headers, token)
+        titles += [post['title'] for post in changes['posts']]
+        token = changes['next_token']
+        pages += 1
+        if not changes['has_more']:
+            break
+
+    assert pages == 3
+    assert len(titles) == len(set(titles)) == 5
+
+def test_invalid_token(client, auth_headers):
+    response = client.get('/api/posts/changes?since=garbage', headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get(
+        '/api/posts/changes', headers=auth_headers, query_string={'since': encode_token({'primary': 1})}
+    )
+    assert response.status_code == 400
+
+def test_legacy_token_requires_full_sync(client, auth_headers):
+    # Токен по (updated_at, id) до появления журнала
+    legacy = encode_token([datetime.utcnow().isoformat(), 'post-id', 'issued'])
+    response = client.get('/api/posts/changes', headers=auth_headers, query_string={'since': legacy})
+    assert response.status_code == 410
+
+def test_expired_token_requires_full_sync(app, client, auth_headers):
+    issued = (datetime.utcnow() - timedelta(days=app.config['SYNC_TOMBSTONE_RETENTION_DAYS'] + 1)).isoformat()
+    expired = encode_token([{'primary': 0}, issued])
+    response = client.get('/api/posts/changes', headers=auth_headers, query_string={'since': expired})
+    assert response.status_code == 410
+
+    fresh = encode_sync_token({'primary': 0})
+    response = client.get('/api/posts/changes', headers=auth_headers, query_string={'since': fresh})
+    assert response.status_code == 200
+
+def test_prune_tombstones(app, add_post):
+    old_id = add_post('testuser', 'old')
+    recent_id = add_post('testuser', 'recent')
+    kept_id = add_post('testuser', 'kept')
+    with app.app_context():
+        db.session.execute(sa.delete(Post).where(Post.id.in_([old_id, recent_id])))
+        db.session.execute(
+            sa.update(PostChange).where(PostChange.post_id == old_id)
+            .values(deleted_at=datetime.utcnow() - timedelta(days=31))
+        )
+        db.session.commit()
+
+        assert prune_tombstones(db, retention_days=30) == 1
+
+    assert _log(app, old_id) is None
+    assert _log(app, recent_id).deleted_at is not None
+    assert _log(app, kept_id).deleted_at is None
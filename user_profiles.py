@@ -0,0 +1,32 @@
+import sqlalchemy as sa
+
+import cached_queries
+from jobs import jobs
+from sharding import shards
+
+# Профиль нового пользователя создается задачей create_user_profile после
+# ответа на регистрацию. Задача идемпотентна: повтор после сбоя не создаст
+# второй профиль, а для удаленного за это время пользователя ничего не делает.
+
+def create_user_profile(db, user_id):
+    tables = db.metadata.tables
+    users = tables['users']
+    profiles = tables['user_profiles']
+    # Проверка и вставка - в основной БД (в шарде пользователя)
+    db.session().use_primary()
+    if shards.enabled and shards.use_user_shard(db, user_id=user_id) is None:
+        return False
+    if db.session.execute(sa.select(users.c.id).where(users.c.id == user_id)).first() is None:
+        return False
+    if db.session.execute(sa.select(profiles.c.id).where(profiles.c.user_id == user_id)).first() is not None:
+        return False
+    db.session.execute(profiles.insert().values(user_id=user_id))
+    db.session.commit()
+    cached_queries.invalidate_users(user_id)
+    return True
+
+def init_user_profiles(app, db):
+    # Задача использует db приложения, которому принадлежит очередь
+    @jobs.task('create_user_profile')
+    def create_user_profile_job(user_id):
+        create_user_profile(db, user_id)